@@ -5,16 +5,29 @@ import folium
 from streamlit_folium import st_folium
 
 import numpy as np
-import plotly.graph_objects as go
 
+# pipeline (scipy), the exporters' rasterio/ezdxf and plotly load on first use
 from core.roi import roi_from_drawn_feature
-from core.pipeline import run_scan_pipeline
-from core.exporters import export_all
+from core.exporters import EXPORT_FORMATS
+from core.compact import grid_of, deep_nbytes
+from core.grid import DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
 from core.report import build_report
 from core.sentinelhub_fetch import have_credentials
 
 st.set_page_config(page_title="AnomaliLab Pro", layout="wide")
 
+# Prometheus /metrics for the fetch telemetry (ANOMALILAB_METRICS_ADDR, default 127.0.0.1:9464), up before the first scan
+from core.telemetry import start_metrics_server
+start_metrics_server()
+
+# the heatmap tile endpoint is bound up front, so a misconfigured port fails here rather than after a scan
+from core.tiles import get_tile_server
+try:
+    get_tile_server()
+except RuntimeError as e:
+    st.error(str(e))
+    st.stop()
+
 st.markdown("""
 <style>
 .block-container {padding-top: 0.6rem; padding-bottom: 2rem;}
@@ -37,11 +50,13 @@ st.session_state.setdefault("status", "Hazır")
 st.session_state.setdefault("last_result", None)
 st.session_state.setdefault("last_settings", None)
 st.session_state.setdefault("last_report", None)
-st.session_state.setdefault("exports_dir", os.path.join(os.getcwd(), "exports"))
 st.session_state.setdefault("map_center", None)
 st.session_state.setdefault("map_zoom", None)
-
-os.makedirs(st.session_state.exports_dir, exist_ok=True)
+st.session_state.setdefault("heat_tiles_url", None)
+st.session_state.setdefault("survey_cells", None)
+st.session_state.setdefault("batch", None)
+st.session_state.setdefault("ablation", None)
+st.session_state.setdefault("batch_active", 0)
 
 c1, c2 = st.columns([0.75, 0.25])
 with c1:
@@ -61,10 +76,38 @@ with tab_map:
         use_real = st.toggle("🌍 Gerçek veri kullan (Sentinel Hub)", value=False)
         if use_real and not have_credentials():
             st.warning("Sentinel Hub secrets bulunamadı. `.streamlit/secrets.toml` ekleyin. Şimdilik DEMO çalışır.")
+        if use_real and have_credentials():
+            from core.telemetry import pu_budget
+            pu = pu_budget()
+            st.caption(f"Processing Unit (bugün): {pu.spent_today():.1f}" + (f" / {pu.daily_limit:g}" if pu.daily_limit else ""))
 
         a_radar = st.checkbox("📡 Radar (Sentinel-1)", value=True)
         a_optic = st.checkbox("🛰️ Optik (Sentinel-2 indeks)", value=True)
         a_thermal = st.checkbox("🔥 Termal (Landsat L2)", value=False)
+        mag_path = st.text_input("🧲 Manyetik grid (yerel GeoTIFF yolu)", value="")
+        dem_path = st.text_input("⛰️ DEM / drone orto (yerel GeoTIFF yolu)", value="")
+        local_rasters = {k: v for k, v in (("magnetic", mag_path), ("dem", dem_path)) if v and os.path.exists(v)}
+        for k, v in (("magnetic", mag_path), ("dem", dem_path)):
+            if v and k not in local_rasters:
+                st.warning(f"Yerel raster bulunamadı: {v}")
+        res_m = st.number_input("Çözünürlük (m/piksel)", min_value=1.0, max_value=500.0, value=DEFAULT_M_PER_PX, step=1.0)
+        mem_mb = st.number_input("Bellek bütçesi (MB)", min_value=32, max_value=8192, value=DEFAULT_MEM_BUDGET_MB, step=32)
+        extraction = st.selectbox("Anomali çıkarımı", ["peaks", "components"],
+                                  format_func={"peaks": "Tepe noktaları (en güçlü 35)", "components": "Bağlı bölgeler (median/MAD eşiği, tümü)"}.get)
+        progressive = st.toggle("⚡ Kademeli tarama (anında önizleme)", value=False)
+        survey = st.toggle("🧭 Alan taraması (fishnet hücreleri, öncelik sırasıyla)", value=False)
+        if survey:
+            cell_km = st.number_input("Hücre boyu (km)", min_value=0.1, max_value=50.0, value=1.0, step=0.5)
+            survey_budget = st.number_input("Hesap bütçesi (sn)", min_value=1, max_value=3600, value=60, step=10)
+            survey_workers = st.number_input("Paralel tarama", min_value=1, max_value=8, value=2, step=1)
+        ablation = st.toggle("🧪 Katman ablasyonu (tüm katman kombinasyonları)", value=False)
+        queue_mode = st.toggle("📬 Kuyruğa gönder (worker filosu: python -m core.worker work)", value=False)
+        prefetch = st.toggle("📥 Arka planda ön-yükleme (görünür alan, PU harcar)", value=False, disabled=not (use_real and have_credentials()))
+        # compaction is opt-in: grid exports are written from the stored (possibly quantized) heatmap
+        compact = st.selectbox("Sonuç saklama", ["float32", "float16", "uint8"],
+                               format_func={"uint8": "Kompakt (uint8, en az bellek; exportlar 8-bit)", "float16": "Kompakt (float16)",
+                                            "float32": "Tam (float32 + ham raster)"}.get)
+        incremental = st.toggle("🔁 Artımlı tarama (yalnızca yeni görüntüler + değişim haritası)", value=False, disabled=progressive)
 
         st.divider()
         st.markdown("#### 📍 Konum")
@@ -77,9 +120,41 @@ with tab_map:
 
         st.markdown('<div class="al-card al-btn">', unsafe_allow_html=True)
         start_scan = st.button("🔎 Taramayı Başlat", type="primary")
+        scan_all = st.button("🗂️ Tüm Çizimleri Tara (ortak çekim)")
+        export_formats = st.multiselect("Export formatları", list(EXPORT_FORMATS), default=list(EXPORT_FORMATS))
         export_btn = st.button("⬇️ Sonuçları Export Et", type="secondary")
         st.markdown("</div>", unsafe_allow_html=True)
 
+        if st.session_state.batch:
+            labels = [f"ROI #{i+1} — {len(b['result']['anomaly_points'])} anomali" for i, b in enumerate(st.session_state.batch)]
+            sel = st.selectbox("Aktif ROI (toplu tarama)", range(len(labels)), format_func=labels.__getitem__, index=st.session_state.batch_active)
+            if sel != st.session_state.batch_active:
+                b = st.session_state.batch[sel]
+                st.session_state.batch_active = sel
+                st.session_state.last_result, st.session_state.last_report = b["result"], b["report"]
+                st.session_state.heat_tiles_url = b["tiles_url"]
+
+        if queue_mode:
+            from core.jobqueue import JobQueue
+            jq = JobQueue()
+            with st.expander("📬 İşler", expanded=True):
+                st.caption(" • ".join(f"{k}: {v}" for k, v in sorted(jq.counts().items())) or "Kuyruk boş.")
+                for j in jq.list(10):
+                    a, b = st.columns([0.72, 0.28])
+                    a.write(f"`{j['id']}` {j['state']} ({j['attempts']}/{j['max_attempts']})" + (f" — {j['lease_owner']}" if j["lease_owner"] else ""))
+                    if j["state"] == "done" and b.button("Yükle", key=f"job_{j['id']}"):
+                        res_j = jq.load_result(j["id"])
+                        job = jq.get(j["id"])
+                        from core.tiles import get_tile_server
+                        tiles = get_tile_server()
+                        st.session_state.heat_tiles_url = tiles.url_template(tiles.publish(res_j["heatmap"], res_j["georef"]))
+                        st.session_state.last_settings = job["settings"]
+                        st.session_state.last_report = build_report(res_j, job["settings"], use_real_data=job["use_real_data"])
+                        st.session_state.last_result = res_j
+                        st.session_state.batch = None
+                        st.rerun()
+                st.button("🔄 Yenile", key="jobs_refresh")
+
         if st.session_state.last_result is not None:
             st.markdown('<div class="al-card">', unsafe_allow_html=True)
             st.markdown("#### 📌 Anomali Listesi (Anomaliye Git)")
@@ -90,7 +165,7 @@ with tab_map:
                 for i, p in enumerate(pts[:25], start=1):
                     a, b = st.columns([0.72, 0.28])
                     with a:
-                        st.write(f"#{i} **{p['polarity']}** | score={p['score']} | depth={p['depth_m']}m | vol={p['volume_m3']}m³")
+                        st.write(f"#{i} **{p['polarity']}** | score={p['score']} | r={p['radius_m']}m | depth={p['depth_m']}m | vol={p['volume_m3']}m³")
                         st.caption(f"{p['lat']}, {p['lon']}")
                     with b:
                         if st.button("📍 Git", key=f"goto_{i}"):
@@ -114,11 +189,27 @@ with tab_map:
             overlay=False,
         ).add_to(m)
 
+        for cell in st.session_state.survey_cells or []:
+            x0, y0, x1, y1 = cell["bounds"]
+            scanned = "n" in cell
+            folium.Rectangle([(y0, x0), (y1, x1)], color="#f59e0b" if scanned else "#64748b", weight=1, fill=scanned, fill_opacity=0.05,
+                             tooltip=f"#{cell['rank']} skor={cell['score']}" + (f" | {cell['n']} anomali, en yüksek {cell['top']}" if scanned else " | taranmadı")).add_to(m)
+
         if st.session_state.last_result is not None:
             r = st.session_state.last_result
             roi = r["roi"]
             pts = r["anomaly_points"]
 
+            if st.session_state.heat_tiles_url:
+                folium.TileLayer(
+                    tiles=st.session_state.heat_tiles_url,
+                    attr="AnomaliLab",
+                    name="Anomali ısı haritası",
+                    overlay=True,
+                    control=True,
+                    opacity=0.7,
+                ).add_to(m)
+
             coords = [(y, x) for x, y in list(roi.polygon.exterior.coords)]
             folium.Polygon(coords, color="#7c3aed", weight=2, fill=True, fill_opacity=0.08).add_to(m)
 
@@ -142,7 +233,7 @@ with tab_map:
         ).add_to(m)
 
         folium.LayerControl(collapsed=True).add_to(m)
-        out = st_folium(m, height=640, width=None, returned_objects=["last_active_drawing", "all_drawings"])
+        out = st_folium(m, height=640, width=None, returned_objects=["last_active_drawing", "all_drawings", "bounds"])
 
     roi = None
     try:
@@ -152,41 +243,167 @@ with tab_map:
     except Exception:
         roi = None
 
-    if start_scan:
+    if use_real and have_credentials():
+        # speculative fetch of the drawn ROI (else the viewport) so the scan starts from local data
+        from core.prefetch import Prefetcher, pad_bbox, prefetch_cache
+        # one prefetcher per session (their targets would cancel each other); the cache is shared
+        if st.session_state.get("prefetcher") is None:
+            st.session_state.prefetcher = Prefetcher(prefetch_cache())
+        prefetcher = st.session_state.prefetcher
+        vb = out.get("bounds") or {}
+        if not prefetch:
+            prefetcher.cancel()
+        elif roi is not None:
+            prefetcher.request(pad_bbox(roi.polygon.bounds), dict(radar=a_radar, optic=a_optic, thermal=a_thermal), res_m)
+        elif vb.get("_southWest") and vb.get("_northEast"):
+            sw, ne = vb["_southWest"], vb["_northEast"]
+            prefetcher.request((sw["lng"], sw["lat"], ne["lng"], ne["lat"]), dict(radar=a_radar, optic=a_optic, thermal=a_thermal), res_m)
+        if prefetch:
+            ps, cs = prefetcher.state, prefetch_cache().stats()
+            st.caption(f"Ön-yükleme: {'çekiliyor: ' + ps['running'] if ps['running'] else ('bekliyor' if ps['pending'] else 'boşta')}"
+                       f" • önbellek {cs['entries']} katman, {cs['mb']} MB"
+                       + (" • PU rezervi için durduruldu" if ps["budget_skips"] else ""))
+
+    rois = []
+    if scan_all:
+        for f in out.get("all_drawings") or []:
+            try:
+                rois.append(roi_from_drawn_feature(f))
+            except Exception:
+                pass
+        roi = rois[0] if rois else None
+
+    if start_scan or scan_all:
         st.session_state.status = "Tarama çalışıyor..."
         prog = st.progress(0, text="Hazırlanıyor...")
-        for i in range(10):
-            time.sleep(0.06)
-            prog.progress((i+1)*6, text="Veri hazırlanıyor...")
+        if not progressive:
+            for i in range(10):
+                time.sleep(0.06)
+                prog.progress((i+1)*6, text="Veri hazırlanıyor...")
 
+        settings = dict(radar=a_radar, optic=a_optic, thermal=a_thermal, magnetic="magnetic" in local_rasters)
         if roi is None:
             st.warning("ROI seçilmedi. Haritada bir alan çiz.")
             st.session_state.status = "Hazır"
+        elif use_real and have_credentials() and pu.remaining() <= 0:
+            st.error("Günlük Processing Unit bütçesi doldu; gerçek veri taraması yarın tekrar açılır.")
+            st.session_state.status = "Hazır"
+        elif queue_mode:
+            from core.jobqueue import JobQueue
+            # same scan as the button: local raster paths must also exist on the worker hosts
+            ids = [JobQueue().submit(r, settings, use_real_data=use_real, target_m_per_px=res_m, mem_budget_mb=mem_mb, extraction=extraction,
+                                     incremental=incremental, local_rasters=local_rasters or None)
+                   for r in (rois or [roi])]
+            prog.progress(100, text="Kuyruğa alındı")
+            st.session_state.status = "İş kuyrukta"
+            st.success(f"{len(ids)} iş kuyruğa alındı: {', '.join(ids)}")
         else:
-            prog.progress(70, text="Analiz çalışıyor...")
-            settings = dict(radar=a_radar, optic=a_optic, thermal=a_thermal, magnetic=False)
-            result = run_scan_pipeline(roi, settings=settings, use_real_data=use_real)
-
-            st.session_state.last_result = result
-            st.session_state.last_settings = settings
-            st.session_state.last_report = build_report(result, settings, use_real_data=use_real)
-
-            prog.progress(100, text="Bitti ✅")
-            st.session_state.status = "Tarama tamamlandı"
-            st.success(f"Tarama tamamlandı. Anomali sayısı: {len(result['anomaly_points'])}")
-            st.info("📄 Rapor sekmesine geçip kartları ve 3D modeli görebilirsin.")
+            from core.telemetry import PUBudgetExceeded
+            try:
+                prog.progress(70, text="Analiz çalışıyor...")
+                st.session_state.survey_cells = None
+                st.session_state.batch = None
+                st.session_state.ablation = None
+                ab = None
+                if ablation and not scan_all:
+                    from core.ablation import run_ablation
+                    try:
+                        ab = run_ablation(roi, settings, use_real_data=use_real, target_m_per_px=res_m, mem_budget_mb=mem_mb,
+                                          extraction=extraction, local_rasters=local_rasters or None)
+                    except ValueError as e:
+                        st.warning(f"{e} Normal tarama yapılıyor.")
+                if ab is not None:
+                    from core.compact import compact_result
+                    result = ab["subsets"][-1]
+                    st.session_state.ablation = [r if compact == "float32" else compact_result(r, compact) for r in ab["subsets"]]
+                    st.info(f"Ablasyon: {len(ab['subsets'])} katman kombinasyonu tek geçişte hesaplandı.")
+                elif scan_all:
+                    from core.batch import run_batch_scan
+                    from core.tiles import get_tile_server
+                    from core.compact import compact_result
+                    tiles = get_tile_server()
+                    batch = run_batch_scan(rois, settings, use_real_data=use_real, target_m_per_px=res_m, mem_budget_mb=mem_mb,
+                                           extraction=extraction, local_rasters=local_rasters or None)
+                    st.session_state.batch = [{"result": r if compact == "float32" else compact_result(r, compact),
+                                               "report": build_report(r, settings, use_real_data=use_real),
+                                               "tiles_url": tiles.url_template(tiles.publish(r["heatmap"], r["georef"]))} for r in batch]
+                    st.session_state.batch_active = 0
+                    st.info(f"Toplu tarama: {len(rois)} ROI, {batch[0]['batch']['groups']} ortak çekim grubu.")
+                    del batch
+                    # ROI #1 is already published, reported and compacted above
+                    first = st.session_state.batch[0]
+                    result = first["result"]
+                    st.session_state.heat_tiles_url = first["tiles_url"]
+                    st.session_state.last_report = first["report"]
+                elif survey:
+                    from core.survey import plan_survey, run_survey
+                    prog.progress(72, text="Kaba puanlama (tüm alan)...")
+                    cells = plan_survey(roi, settings, use_real_data=use_real, cell_m=cell_km * 1000, local_rasters=local_rasters or None)["cells"]
+                    st.session_state.survey_cells = [{k: c[k] for k in ("rank", "score", "bounds")} for c in cells]
+                    # only the highest-priority finished cell's result is kept (it becomes the active result); the rest leave a summary
+                    best, n_done = None, 0
+                    for upd in run_survey(cells, settings, use_real_data=use_real, workers=int(survey_workers), budget_s=survey_budget,
+                                          target_m_per_px=res_m, mem_budget_mb=mem_mb, extraction=extraction, local_rasters=local_rasters or None):
+                        n_done += 1
+                        cell_pts = upd["result"]["anomaly_points"]
+                        st.session_state.survey_cells[upd["cell"]["rank"] - 1].update(n=len(cell_pts), top=max((p["score"] for p in cell_pts), default=0))
+                        if best is None or upd["cell"]["rank"] < best["cell"]["rank"]:
+                            best = upd
+                        prog.progress(72 + int(27 * upd["done"] / len(cells)), text=f"Hücre #{upd['cell']['rank']} tamamlandı ({upd['done']}/{len(cells)})")
+                        del upd, cell_pts
+                    result = best.pop("result")
+                    del best
+                    st.info(f"Alan taraması: {len(cells)} hücre, {n_done} tam tarandı, {len(cells) - n_done} bütçe dışında kaldı.")
+                elif progressive:
+                    from core.progressive import run_progressive_scan
+                    preview = st.empty()
+                    for result in run_progressive_scan(roi, settings=settings, use_real_data=use_real, target_m_per_px=res_m, mem_budget_mb=mem_mb,
+                                                       extraction=extraction, local_rasters=local_rasters or None):
+                        stage = {"preview": "Önizleme", "refine": "İyileştiriliyor", "final": "Tam çözünürlük"}[result["stage"]]
+                        prog.progress(70 + int(29 * result["progress"]), text=f"{stage}...")
+                        preview.image(result["heatmap"], clamp=True, caption=f"{stage} — {result['grid']['H']}×{result['grid']['W']} px, {len(result['anomaly_points'])} aday")
+                else:
+                    # identical concurrent scans from other sessions share one computation
+                    from core.singleflight import run_scan_shared
+                    result = run_scan_shared(roi, settings=settings, use_real_data=use_real, target_m_per_px=res_m, mem_budget_mb=mem_mb,
+                                             incremental=incremental, extraction=extraction, local_rasters=local_rasters or None)
+
+                if not scan_all:
+                    from core.tiles import get_tile_server
+                    tiles = get_tile_server()
+                    st.session_state.heat_tiles_url = tiles.url_template(tiles.publish(result["heatmap"], result["georef"]))
+                    st.session_state.last_report = build_report(result, settings, use_real_data=use_real)
+                    if compact != "float32":
+                        from core.compact import compact_result
+                        result = compact_result(result, compact)
+                st.session_state.last_settings = settings
+                st.session_state.last_result = result
+
+                prog.progress(100, text="Bitti ✅")
+                st.session_state.status = "Tarama tamamlandı"
+                st.success(f"Tarama tamamlandı. Anomali sayısı: {len(result['anomaly_points'])}")
+                st.info("📄 Rapor sekmesine geçip kartları ve 3D modeli görebilirsin.")
+            except PUBudgetExceeded as e:
+                # the budget ran out mid-scan (the check above only catches an already-empty budget)
+                prog.empty()
+                st.error(f"{e} Tarama durduruldu; gerçek veri taraması yarın tekrar açılır.")
+                st.session_state.status = "Hazır"
 
     if export_btn:
         if st.session_state.last_result is None:
             st.warning("Önce tarama yap.")
         else:
             st.session_state.status = "Export ediliyor..."
-            exported = export_all(st.session_state.last_result, exports_dir=st.session_state.exports_dir)
-            st.session_state.status = "Export hazır"
-            st.success("Export tamamlandı. Dosyalar 'exports/' klasörüne kaydedildi.")
-            for label, path in exported.items():
-                with open(path, "rb") as f:
-                    st.download_button(f"İndir: {os.path.basename(path)}", f, file_name=os.path.basename(path), mime="application/octet-stream")
+            from core.exporters import export_zip_bytes
+            try:
+                bundle = export_zip_bytes(st.session_state.last_result, formats=export_formats)
+            except ValueError as e:
+                st.session_state.status = "Hazır"
+                st.warning(str(e))
+            else:
+                st.session_state.status = "Export hazır"
+                st.success(f"Export tamamlandı: {len(export_formats)} dosya, {len(bundle) / 1e6:.1f} MB (ZIP).")
+                st.download_button("İndir: anomalilab_export.zip", bundle, file_name="anomalilab_export.zip", mime="application/zip")
 
 with tab_report:
     if st.session_state.last_result is None or st.session_state.last_report is None:
@@ -207,7 +424,8 @@ with tab_report:
 
         st.markdown('<div class="al-card">', unsafe_allow_html=True)
         st.markdown("#### 🧊 3D Görselleştirme (Heatmap Surface)")
-        heat = res["heatmap"]
+        import plotly.graph_objects as go
+        heat = grid_of(res)
         X = np.linspace(0, 1, heat.shape[1])
         Y = np.linspace(0, 1, heat.shape[0])
         fig = go.Figure(data=[go.Surface(z=heat, x=X, y=Y)])
@@ -215,6 +433,27 @@ with tab_report:
         st.plotly_chart(fig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+        change = grid_of(res, "change_heatmap")
+        if change is not None:
+            st.markdown('<div class="al-card">', unsafe_allow_html=True)
+            st.markdown("#### 🔁 Değişim Haritası (önceki taramaya göre)")
+            fig_d = go.Figure(data=[go.Heatmap(z=change[::-1], colorscale="RdBu", zmid=0)])
+            fig_d.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=360)
+            st.plotly_chart(fig_d, use_container_width=True)
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        if st.session_state.ablation:
+            st.markdown('<div class="al-card">', unsafe_allow_html=True)
+            st.markdown("#### 🧪 Katman Ablasyonu")
+            st.caption("Eşleşme: tüm katmanlarla bulunan anomalilerin bu kombinasyonda da (±3 px, aynı polarite) bulunan oranı.")
+            subsets = st.session_state.ablation
+            for r0 in range(0, len(subsets), 4):
+                for col, sub in zip(st.columns(4), subsets[r0:r0 + 4]):
+                    with col:
+                        st.image(grid_of(sub), clamp=True, use_container_width=True,
+                                 caption=f"{' + '.join(sub['layers'])} — {len(sub['anomaly_points'])} anomali, %{round(sub['match_full'] * 100)} eşleşme")
+            st.markdown("</div>", unsafe_allow_html=True)
+
         st.markdown("#### 📍 Bulgu Kartları (Top 3)")
         top = rep["findings_top3"]
         cols = st.columns(3)
@@ -231,6 +470,7 @@ with tab_report:
   <div class="small-note">Zaman: {rep["timestamp"]}</div>
   <div style="margin-top:8px">
     <b>Koordinat:</b> {p["lat"]}, {p["lon"]}<br/>
+    <b>Yarıçap:</b> {p["radius_m"]} m (σ={p["sigma_px"]} px)<br/>
     <b>Derinlik:</b> {p["depth_m"]} m<br/>
     <b>Hacim:</b> {p["volume_m3"]} m³<br/>
     <b>z_rel:</b> {p["z_rel"]}<br/>
@@ -249,6 +489,8 @@ with tab_report:
             "Veri tipi": rep["data_type"],
             "Kaynaklar": rep["sources_used"],
             "Kullanılan katmanlar": [k for k,v in settings.items() if v],
+            "Izgara": f"{res['grid']['H']}×{res['grid']['W']} px, {res['grid']['m_per_px']} m/piksel" + (" (karolu)" if res["grid"]["tiled"] else ""),
+            "Oturum belleği": f"{(deep_nbytes(res) + deep_nbytes(rep)) / 1e6:.2f} MB ({res.get('compact') or 'float32'})",
             "Kullanılan modeller": rep["models_used"],
             "Yöntemler": rep["methods_used"],
             "Anomali paternleri": rep["patterns"],
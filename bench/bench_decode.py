@@ -0,0 +1,96 @@
+"""Process API payload benchmark: FLOAT32 vs UINT16 transfer, legacy vs zero-copy decoding.
+
+Two parts:
+
+* decode: the same stub payloads decoded the old way (sentinelhub
+  decode_data + .astype(float32)) and through core.sentinelhub_fetch.decode_tiff,
+  timing and peak traced allocation per decode;
+* fetch: real fetch_* calls against bench/sh_stub.py (gzip on) in both
+  transfer modes, with wire bytes, wall time and peak allocation per scan.
+
+Usage: python bench/bench_decode.py [--size 512] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import numpy as np  # noqa: E402
+from sh_stub import StubConfig, serve, synthetic_tiff, TOKEN_PATH  # noqa: E402
+
+def _measure(fn, rounds: int):
+    """(best seconds, peak traced bytes) of fn over rounds."""
+    best, peak = float("inf"), 0
+    for _ in range(rounds):
+        tracemalloc.start()
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return best, peak
+
+def bench_decode(size: int, rounds: int):
+    from sentinelhub import MimeType
+    from sentinelhub.decoding import decode_data
+    from core.sentinelhub_fetch import decode_tiff, S2_CODEC
+
+    bbox = [35.0, 39.0, 35.05, 39.05]
+    f32 = synthetic_tiff(bbox, size, size, 4, 'sampleType: "FLOAT32"')
+    u16 = synthetic_tiff(bbox, size, size, 4, 'sampleType: "UINT16"')
+    out_mb = size * size * 4 * 4 / 1e6
+    print(f"decode {size}x{size}x4 (float32 result {out_mb:.1f} MB)")
+    print(f"{'path':34} {'payload_MB':>10} {'best_ms':>8} {'peak_MB':>8}")
+    rows = [
+        ("legacy FLOAT32 decode+astype", f32, lambda: decode_data(f32, MimeType.TIFF).astype(np.float32)),
+        ("decode_tiff FLOAT32", f32, lambda: decode_tiff(f32)),
+        ("legacy UINT16 decode+astype+scale", u16, lambda: decode_data(u16, MimeType.TIFF).astype(np.float32) * S2_CODEC.step + S2_CODEC.lo),
+        ("decode_tiff UINT16 (codec)", u16, lambda: decode_tiff(u16, S2_CODEC)),
+    ]
+    decode_tiff(u16, S2_CODEC)  # warm the per-thread staging buffer
+    for name, payload, fn in rows:
+        best, peak = _measure(fn, rounds)
+        print(f"{name:34} {len(payload) / 1e6:10.2f} {best * 1e3:8.1f} {peak / 1e6:8.1f}")
+
+def bench_fetch(size: int, rounds: int):
+    cfg = StubConfig(gzip=True)
+    httpd, stats, url = serve(0, cfg)
+    os.environ.update(SH_CLIENT_ID="stub", SH_CLIENT_SECRET="stub", SH_BASE_URL=url,
+                      SH_TOKEN_URL=url + TOKEN_PATH, OAUTHLIB_INSECURE_TRANSPORT="1")
+    from core import sentinelhub_fetch as shf
+
+    print(f"\nfetch s1+s2+thermal at {size}x{size} against the stub (gzip), best of {rounds}")
+    print(f"{'transfer':9} {'wire_MB/scan':>12} {'best_s':>7} {'peak_MB':>8}")
+    for mode in ("float32", "uint16"):
+        os.environ["SH_TRANSFER"] = mode
+        before = stats.snapshot()["bytes_out"]
+        i = [0]
+
+        def _scan():
+            i[0] += 1
+            bbox = (35.0 + i[0] * 0.01, 39.0, 35.05 + i[0] * 0.01, 39.05)
+            for fn in (shf.fetch_s1_vv_vh, shf.fetch_s2_indices, shf.fetch_landsat_thermal):
+                fn(bbox, size=(size, size))
+
+        _scan()  # token + connection warm-up
+        best, peak = _measure(_scan, rounds)
+        wire = (stats.snapshot()["bytes_out"] - before) / (rounds + 1)
+        print(f"{mode:9} {wire / 1e6:12.2f} {best:7.3f} {peak / 1e6:8.1f}")
+    httpd.shutdown()
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--size", type=int, default=512)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args(argv)
+    bench_decode(args.size, args.rounds)
+    bench_fetch(args.size, args.rounds)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Cold-start import benchmark and regression guard.
+
+Runs every measurement in a fresh interpreter so module caches never hide
+import cost. Two checks:
+
+* the imports app.py performs at module level (read from its AST, minus
+  the UI toolkit itself) must not pull in any HEAVY module;
+* each measured target must import within its time budget (best of N).
+
+Usage: python bench/bench_startup.py [--runs 5] [--scale 1.0]
+Exit code 1 on any regression, so it can gate CI.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must only load on first use
+HEAVY = ("scipy", "rasterio", "ezdxf", "plotly", "sentinelhub")
+# UI toolkit imported by app.py on every run; not ours to defer
+UI_MODULES = ("streamlit", "folium", "streamlit_folium")
+
+# seconds, best-of-N in a fresh process; generous for shared CI runners
+BUDGETS = {
+    "app_startup": 0.6,
+    "core.roi": 0.4,
+    "core.grid": 0.4,
+    "core.report": 0.3,
+    "core.exporters": 0.3,
+    "core.sentinelhub_fetch": 0.3,
+    "core.pipeline": 1.5,
+}
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+{stmts}
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt, "modules": sorted(sys.modules)}}))
+"""
+
+def app_startup_imports(app_path: str) -> list:
+    """Top-level import statements of app.py, excluding the UI toolkit."""
+    with open(app_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    stmts = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [a.name for a in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        if any(n.split(".")[0] in UI_MODULES for n in names):
+            continue
+        stmts.append(ast.unparse(node))
+    return stmts
+
+def probe(stmts: list) -> dict:
+    code = _PROBE.format(stmts="\n".join(stmts))
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def best_of(stmts: list, runs: int) -> dict:
+    results = [probe(stmts) for _ in range(runs)]
+    best = min(results, key=lambda r: r["seconds"])
+    return {"seconds": best["seconds"], "modules": best["modules"]}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply all time budgets")
+    args = ap.parse_args(argv)
+
+    targets = {"app_startup": app_startup_imports(os.path.join(ROOT, "app.py"))}
+    for mod in BUDGETS:
+        if mod != "app_startup":
+            targets[mod] = [f"import {mod}"]
+
+    failures = []
+    print(f"{'target':<26}{'best_s':>9}{'budget_s':>10}")
+    for name, stmts in targets.items():
+        r = best_of(stmts, args.runs)
+        budget = BUDGETS[name] * args.scale
+        print(f"{name:<26}{r['seconds']:>9.3f}{budget:>10.3f}")
+        if r["seconds"] > budget:
+            failures.append(f"{name}: {r['seconds']:.3f}s > {budget:.3f}s")
+        if name == "app_startup":
+            loaded = sorted({m.split(".")[0] for m in r["modules"]} & set(HEAVY))
+            if loaded:
+                failures.append(f"app startup imports heavy modules: {', '.join(loaded)}")
+
+    for f in failures:
+        print("REGRESSION:", f)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Load test: concurrent real-data run_scan_pipeline calls against the local Sentinel Hub stub.
+
+Starts bench/sh_stub.py in-process, points the fetch path at it through
+the environment, runs --scans scans on --concurrency threads and prints
+latency percentiles, throughput and what the stub saw (requests, 429s,
+failures, bytes). Scans whose fetch failed fall back to demo data inside
+get_raster_for_roi, so compare `stub ok` with `expected fetches`.
+
+Usage: python bench/load_test.py --scans 40 --concurrency 8 --latency 0.3 --throttle 0.1 --fail 0.02
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from sh_stub import StubConfig, serve, TOKEN_PATH  # noqa: E402
+
+def _pct(values, q):
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scans", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--jitter", type=float, default=0.1)
+    ap.add_argument("--throttle", type=float, default=0.0)
+    ap.add_argument("--fail", type=float, default=0.0)
+    ap.add_argument("--roi-deg", type=float, default=0.01, help="ROI side in degrees")
+    ap.add_argument("--m-per-px", type=float, default=10.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--metrics", action="store_true", help="print the fetch telemetry (Prometheus text) at the end")
+    args = ap.parse_args(argv)
+
+    cfg = StubConfig(latency_s=args.latency, jitter_s=args.jitter, throttle_rate=args.throttle, fail_rate=args.fail, seed=args.seed)
+    httpd, stats, url = serve(0, cfg)
+    os.environ.update(SH_CLIENT_ID="stub", SH_CLIENT_SECRET="stub", SH_BASE_URL=url,
+                      SH_TOKEN_URL=url + TOKEN_PATH, OAUTHLIB_INSECURE_TRANSPORT="1")
+
+    from core.roi import roi_from_bbox
+    from core.grid import plan_grid
+    from core.pipeline import run_scan_pipeline
+
+    settings = dict(radar=True, optic=True, thermal=True, magnetic=False)
+    rois = [roi_from_bbox(35 + i * 0.05, 39, 35 + i * 0.05 + args.roi_deg, 39 + args.roi_deg) for i in range(args.scans)]
+    layers = sum(1 for k in ("radar", "optic", "thermal") if settings[k])
+    expected = sum(layers * sum(1 for _ in plan_grid(r, target_m_per_px=args.m_per_px).tiles()) for r in rois)
+
+    def _scan(roi):
+        t = time.perf_counter()
+        run_scan_pipeline(roi, settings=settings, use_real_data=True, target_m_per_px=args.m_per_px)
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        lat = list(pool.map(_scan, rois))
+    wall = time.perf_counter() - t0
+    httpd.shutdown()
+
+    s = stats.snapshot()
+    print(f"scans={args.scans} concurrency={args.concurrency} wall={wall:.2f}s throughput={args.scans / wall:.2f} scans/s")
+    print(f"latency p50={_pct(lat, 0.5):.3f}s p95={_pct(lat, 0.95):.3f}s max={max(lat):.3f}s")
+    print(f"expected fetches={expected} stub ok={s['ok']} requests={s['requests']} 429={s['throttled']} "
+          f"5xx={s['failed']} tokens={s['tokens']} MB out={s['bytes_out'] / 1e6:.1f}")
+    if args.metrics:
+        from core.telemetry import metrics
+        print(metrics.render(), end="")
+    return 0 if s["ok"] >= expected else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Local stand-in for the Sentinel Hub OAuth token endpoint and Process API.
+
+Serves deterministic synthetic float32 TIFFs (same bbox/size/evalscript ->
+same bytes) with configurable latency, 429 throttling and 5xx failures, so
+the fetch path can be load-tested offline. Point the app at it with:
+
+    SH_CLIENT_ID=stub SH_CLIENT_SECRET=stub
+    SH_BASE_URL=http://127.0.0.1:8790
+    SH_TOKEN_URL=http://127.0.0.1:8790/oauth/token
+    OAUTHLIB_INSECURE_TRANSPORT=1   # the token endpoint is plain http
+
+Usage: python bench/sh_stub.py [--port 8790] [--latency 0.2] [--throttle 0.1] [--fail 0.02]
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+TOKEN_PATH = "/oauth/token"
+PROCESS_PATH = "/api/v1/process"
+
+@dataclass
+class StubConfig:
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    throttle_rate: float = 0.0  # share of process calls answered with 429
+    fail_rate: float = 0.0  # share of process calls answered with 500
+    retry_after_s: int = 1
+    gzip: bool = False  # honour Accept-Encoding: gzip (bytes_out counts wire bytes)
+    seed: int = 0
+
+@dataclass
+class StubStats:
+    tokens: int = 0
+    requests: int = 0
+    ok: int = 0
+    throttled: int = 0
+    failed: int = 0
+    bytes_out: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **kw):
+        with self.lock:
+            for k, v in kw.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {k: getattr(self, k) for k in ("tokens", "requests", "ok", "throttled", "failed", "bytes_out")}
+
+def _output_bands(evalscript: str) -> int:
+    m = re.search(r"output\s*:\s*\{\s*bands\s*:\s*(\d+)", evalscript)
+    return int(m.group(1)) if m else 1
+
+def synthetic_tiff(bounds, width: int, height: int, bands: int, evalscript: str) -> bytes:
+    import tifffile
+    seed = int.from_bytes(hashlib.sha1(json.dumps([bounds, width, height, evalscript]).encode()).digest()[:8], "little")
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    data = rng.normal(0, 0.1, (height, width, bands)).astype(np.float32)
+    for _ in range(5):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        s = rng.uniform(0.05, 0.2) * max(width, height)
+        amp = rng.uniform(-1, 1, bands).astype(np.float32)
+        data += np.exp(-((x - cx)**2 + (y - cy)**2) / (2 * s * s))[..., None] * amp
+    if re.search(r'sampleType\s*:\s*"UINT16"', evalscript):
+        # UINT16 evalscripts: DN 1..65535 over the synthetic value range (0 stays no-data)
+        lo, hi = float(data.min()), float(data.max())
+        data = (np.rint((data - lo) / (hi - lo + 1e-12) * 65534) + 1).astype(np.uint16)
+    buf = io.BytesIO()
+    if bands == 1:  # like the real service: single-band outputs are plain 2D TIFFs
+        tifffile.imwrite(buf, data[..., 0], photometric="minisblack")
+    else:
+        tifffile.imwrite(buf, data, photometric="minisblack", planarconfig="contig")
+    return buf.getvalue()
+
+def make_handler(cfg: StubConfig, stats: StubStats):
+    rnd = random.Random(cfg.seed)
+    rnd_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, code: int, body: bytes, ctype: str, headers: dict | None = None):
+            if cfg.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+                body = gzip.compress(body, compresslevel=1)
+                headers = dict(headers or {}, **{"Content-Encoding": "gzip"})
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, str(v))
+            self.end_headers()
+            self.wfile.write(body)
+            if ctype == "image/tiff":
+                stats.add(ok=1, bytes_out=len(body))
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+            path = self.path.split("?")[0]
+            if path == TOKEN_PATH:
+                stats.add(tokens=1)
+                tok = {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600,
+                       "expires_at": time.time() + 3600}
+                self._send(200, json.dumps(tok).encode(), "application/json")
+                return
+            if path != PROCESS_PATH:
+                self._send(404, b"{}", "application/json")
+                return
+
+            stats.add(requests=1)
+            with rnd_lock:
+                delay = cfg.latency_s + rnd.uniform(0, cfg.jitter_s)
+                roll = rnd.random()
+            time.sleep(delay)
+            if roll < cfg.throttle_rate:
+                stats.add(throttled=1)
+                self._send(429, b'{"error":{"status":429,"reason":"Too Many Requests"}}', "application/json",
+                           {"Retry-After": cfg.retry_after_s})
+                return
+            if roll < cfg.throttle_rate + cfg.fail_rate:
+                stats.add(failed=1)
+                self._send(500, b'{"error":{"status":500,"reason":"Stub failure"}}', "application/json")
+                return
+
+            req = json.loads(body or b"{}")
+            out = req.get("output", {})
+            evalscript = req.get("evalscript", "")
+            tiff = synthetic_tiff(req.get("input", {}).get("bounds", {}).get("bbox"),
+                                  int(out.get("width", 256)), int(out.get("height", 256)),
+                                  _output_bands(evalscript), evalscript)
+            self._send(200, tiff, "image/tiff", {"x-processingunits-spent": "1.0"})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+def serve(port: int = 0, cfg: StubConfig | None = None, host: str = "127.0.0.1"):
+    """Start the stub in a daemon thread; returns (httpd, stats, base_url)."""
+    cfg = cfg or StubConfig()
+    stats = StubStats()
+    httpd = ThreadingHTTPServer((host, port), make_handler(cfg, stats))
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="sh-stub", daemon=True).start()
+    return httpd, stats, f"http://{host}:{httpd.server_address[1]}"
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8790)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--throttle", type=float, default=0.0)
+    ap.add_argument("--fail", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--gzip", action="store_true", help="gzip responses when the client accepts it")
+    args = ap.parse_args(argv)
+    cfg = StubConfig(latency_s=args.latency, jitter_s=args.jitter, throttle_rate=args.throttle, fail_rate=args.fail, seed=args.seed,
+                     gzip=args.gzip)
+    httpd, stats, url = serve(args.port, cfg)
+    print(f"Sentinel Hub stub on {url} (token: {url}{TOKEN_PATH})")
+    try:
+        while True:
+            time.sleep(10)
+            print(stats.snapshot())
+    except KeyboardInterrupt:
+        httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
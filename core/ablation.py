@@ -0,0 +1,106 @@
+import math
+from itertools import combinations
+import numpy as np
+from .analysis import BLOB_SCALES, band_sigma, normalize_heatmap, _layer_weight, _scale_bands, _full_res, _ScaleTracker
+from .datasources import get_layer_bands_for_roi
+from .geo import pixel_to_latlon_grid
+from .grid import plan_grid, DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
+from .pipeline import _anomaly_points, _result
+
+MATCH_PX = 3  # an anomaly "persists" in a subset if that subset has one within this many px
+
+def _zsum(bands) -> np.ndarray:
+    """Sum of a layer's z-scored bands (as in fuse_bands); missing pixels count as the band mean."""
+    acc = None
+    for b in bands:
+        z = np.array(b, dtype=np.float32)
+        z -= np.nanmean(z)
+        z /= np.nanstd(z) + 1e-6
+        z[~np.isfinite(z)] = 0.0
+        acc = z if acc is None else acc + z
+    return acc
+
+def _match_rate(ref: list, pts: list, georef: dict) -> float:
+    """Share of ref anomalies with an anomaly of the same polarity within MATCH_PX pixels."""
+    if not ref:
+        return 0.0
+    H, W = georef["H"], georef["W"]
+    px_lat = (georef["lat_max"] - georef["lat_min"]) / max(H - 1, 1)
+    px_lon = (georef["lon_max"] - georef["lon_min"]) / max(W - 1, 1)
+    hits = 0
+    for p in ref:
+        if any(q["polarity"] == p["polarity"] and abs(q["lat"] - p["lat"]) <= MATCH_PX * px_lat
+               and abs(q["lon"] - p["lon"]) <= MATCH_PX * px_lon for q in pts):
+            hits += 1
+    return round(hits / len(ref), 3)
+
+def run_ablation(roi, settings: dict, use_real_data: bool = False,
+                 target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB,
+                 extraction: str = "peaks", local_rasters: dict | None = None) -> dict:
+    """Fused DoG heatmaps and anomalies for every non-empty subset of the enabled layers, from one fetch.
+
+    The fused raster of a subset is the mean of its z-scored bands,
+    standardized; the DoG is linear, so each layer's scale-space DoG bands
+    are computed once and every subset is a weighted sum of them. The
+    subset's standard deviation comes from the layers' covariance matrix.
+    Without missing pixels the all-layers subset matches run_scan_pipeline.
+    """
+    plan = plan_grid(roi, target_m_per_px=target_m_per_px, mem_budget_mb=mem_budget_mb)
+    if plan.tiled:
+        raise ValueError("Ablasyon modu karolu ızgaralarda desteklenmiyor; çözünürlüğü düşürün veya ROI'yi küçültün.")
+    layers = get_layer_bands_for_roi(roi, (plan.H, plan.W), settings, use_real_data=use_real_data, local_rasters=local_rasters)
+    if not layers:
+        raise ValueError("Ablasyon için en az bir katman seçin.")
+    names = list(layers)
+    nbands = np.array([len(layers[n]) for n in names], dtype=np.float64)
+    Z = np.stack([_zsum(layers.pop(n)) for n in names])  # (L, H, W)
+    L, H, W = Z.shape
+
+    Zf = Z.reshape(L, -1).astype(np.float64)
+    mean = Zf.mean(axis=1)
+    cov = Zf @ Zf.T / Zf.shape[1] - np.outer(mean, mean)
+    del Zf
+    # per scale band, (L, h, w) stacks of every layer's band; the first BLOB_SCALES sum to the DoG
+    per_layer = [list(_scale_bands(Z[l])) for l in range(L)]
+    grids = [g for _, g in per_layer[0]]
+    P = [np.stack([per_layer[l][k][0] for l in range(L)]) for k in range(len(grids))]
+    del Z, per_layer
+
+    subsets = [s for k in range(1, L + 1) for s in combinations(range(L), k)]
+    M = np.zeros((len(subsets), L))
+    for i, s in enumerate(subsets):
+        n = nbands[list(s)].sum()
+        m = np.zeros(L)
+        m[list(s)] = 1.0 / n
+        std = math.sqrt(max(float(m @ cov @ m), 0.0))
+        w = _layer_weight({names[j]: True for j in s})
+        M[i] = m / (std + 1e-6) * w
+
+    georef = pixel_to_latlon_grid(roi, H=H, W=W)
+    # subsets are combined in chunks so their DoGs and scale trackers (~8 grids each) stay within the memory budget
+    chunk = max(1, int(mem_budget_mb * 1024 * 1024 // (H * W * 4 * 8)))
+    out = []
+    for c0 in range(0, len(subsets), chunk):
+        Mc = M[c0:c0 + chunk].astype(np.float32)
+        dogs = np.zeros((len(Mc), H, W), dtype=np.float32)
+        tracks = [_ScaleTracker((H, W)) for _ in range(len(Mc))]
+        for k, (Pk, grid) in enumerate(zip(P, grids)):
+            B = np.einsum("sl,lhw->shw", Mc, Pk)
+            if k < BLOB_SCALES:
+                dogs += B
+            for j in range(len(Mc)):
+                tracks[j].add(_full_res(B[j], grid, (H, W)))
+            del B
+        for j in range(dogs.shape[0]):
+            s = subsets[c0 + j]
+            heat = normalize_heatmap(dogs[j])
+            idx = tracks[j].code()
+            pts = _anomaly_points(heat, georef, plan.m_per_px, lambda r, c, idx=idx: band_sigma(idx[r, c]), extraction)
+            res = _result(roi, heat, None, pts, georef, plan)
+            res["layers"] = [names[k] for k in s]
+            out.append(res)
+
+    full = out[-1]["anomaly_points"]
+    for res in out:
+        res["match_full"] = _match_rate(full, res["anomaly_points"], georef)
+    return {"layers": names, "subsets": out, "grid": out[-1]["grid"]}
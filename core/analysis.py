@@ -1,20 +1,186 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from scipy.ndimage import gaussian_filter
+from scipy.ndimage import gaussian_filter, label
 
-def compute_anomaly_heatmap(raster: np.ndarray, settings: dict) -> np.ndarray:
-    """Return 0..1 anomaly heatmap (demo)."""
+DOG_SIGMAS = (1.2, 6.0)
+BLOB_SCALES = 4  # geometric steps between DOG_SIGMAS
+SCALE_SIGMA_MAX = 20.0  # the scale stack continues past DOG_SIGMAS[1] at the same ratio up to this sigma
+SCALE_CODE_STEPS = 32  # per octave, resolution of the uint8 scale code
+
+def scale_sigmas(n: int = BLOB_SCALES) -> list:
+    """Blur sigmas (px) of the scale stack: n geometric steps across DOG_SIGMAS, then on to SCALE_SIGMA_MAX."""
+    s0, s1 = DOG_SIGMAS
+    k = (s1 / s0) ** (1.0 / n)
+    sig = [s0 * k**i for i in range(n + 1)]
+    while sig[-1] < SCALE_SIGMA_MAX:
+        sig.append(sig[-1] * k)
+    return sig
+
+DOG_HALO_PX = int(math.ceil(4.0 * scale_sigmas()[-1]))  # gaussian_filter truncate=4.0
+
+def _layer_weight(settings: dict) -> float:
     w = 1.0
     if settings.get("radar"): w += 0.6
     if settings.get("optic"): w += 0.4
     if settings.get("thermal"): w += 0.8
     if settings.get("magnetic"): w += 0.5
+    return w
+
+def difference_of_gaussians(raster: np.ndarray, settings: dict) -> np.ndarray:
+    """Weighted, unnormalized DoG response."""
+    sm1 = gaussian_filter(raster, sigma=DOG_SIGMAS[0])
+    sm2 = gaussian_filter(raster, sigma=DOG_SIGMAS[1])
+    return (sm1 - sm2) * _layer_weight(settings)
+
+def band_sigma(code):
+    """Characteristic sigma (px) of a uint8 scale code from scale_space_dog (scalar or array)."""
+    sig = scale_sigmas()
+    return math.sqrt(sig[0] * sig[1]) * 2.0 ** (np.asarray(code, dtype=np.float64) / SCALE_CODE_STEPS)
+
+def _scale_bands(raster: np.ndarray, origin=(0, 0)):
+    """Yield (band, grid) for each DoG band of the scale stack, finest first.
+
+    Blurs are built incrementally, each from the previous one. Past
+    DOG_SIGMAS[1] the blur is decimated by 2 whenever its sigma reaches 4 px,
+    so the coarse bands cost little; grid = (row0, col0, step) places a
+    band's samples in raster pixels. Samples sit on multiples of step in
+    the grid whose pixel (0, 0) is raster pixel -origin, so tiles cut from
+    one grid decimate alike.
+    """
+    sig = scale_sigmas()
+    r0, c0, step = 0, 0, 1
+    blur = gaussian_filter(raster, sigma=sig[0])
+    for i in range(1, len(sig)):
+        if i > BLOB_SCALES and sig[i - 1] / step >= 4.0:
+            nr, nc = -origin[0] % (2 * step), -origin[1] % (2 * step)
+            blur = blur[(nr - r0) // step::2, (nc - c0) // step::2]
+            r0, c0, step = nr, nc, 2 * step
+        nxt = gaussian_filter(blur, sigma=math.sqrt(sig[i]**2 - sig[i-1]**2) / step)
+        yield blur - nxt, (r0, c0, step)
+        blur = nxt
+
+def _full_res(band: np.ndarray, grid, shape) -> np.ndarray:
+    """Nearest-sample a decimated band back onto the raster's pixels."""
+    r0, c0, step = grid
+    if step == 1:
+        return band
+    rows = np.clip((np.arange(shape[0]) - r0 + step // 2) // step, 0, band.shape[0] - 1)
+    cols = np.clip((np.arange(shape[1]) - c0 + step // 2) // step, 0, band.shape[1] - 1)
+    return band[np.ix_(rows, cols)]
+
+class _ScaleTracker:
+    """Per-pixel argmax of |DoG band| over the scale stack, refined by a parabola through its neighbours.
+
+    The bands share one sigma ratio, so their responses are already scale
+    normalized: a Gaussian blob of sigma s peaks in the band whose geometric
+    mean sigma is s, symmetrically in log sigma.
+    """
+
+    def __init__(self, shape):
+        self.best = np.zeros(shape, dtype=np.float32)
+        self.below = np.zeros(shape, dtype=np.float32)
+        self.above = np.full(shape, -1.0, dtype=np.float32)  # -1: best band has no coarser neighbour yet
+        self.prev = np.full(shape, -1.0, dtype=np.float32)
+        self.idx = np.zeros(shape, dtype=np.int16)
+        self.n = 0
+
+    def add(self, band: np.ndarray):
+        a = np.abs(band, dtype=np.float32)
+        np.copyto(self.above, a, where=self.idx == self.n - 1)
+        better = a > self.best
+        np.copyto(self.below, self.prev, where=better)
+        np.copyto(self.above, -1.0, where=better)
+        np.copyto(self.idx, self.n, where=better)
+        np.maximum(self.best, a, out=self.best)
+        self.prev = a
+        self.n += 1
+
+    def code(self) -> np.ndarray:
+        """uint8 scale codes for band_sigma."""
+        lo, hi, mid = self.below, self.above, self.best
+        den = lo - 2.0 * mid + hi
+        ok = (lo >= 0) & (hi >= 0) & (den < 0)
+        off = np.zeros(mid.shape, dtype=np.float32)
+        np.divide(0.5 * (lo - hi), den, out=off, where=ok)
+        t = self.idx + np.clip(off, -0.5, 0.5)
+        sig = scale_sigmas()
+        octaves = t * math.log2(sig[1] / sig[0])
+        return np.clip(np.rint(octaves * SCALE_CODE_STEPS), 0, 255).astype(np.uint8)
+
+def scale_space_dog(raster: np.ndarray, settings: dict, origin=(0, 0)):
+    """Weighted DoG over DOG_SIGMAS plus the per-pixel characteristic scale as a uint8 code.
+
+    The first BLOB_SCALES bands telescope to the two-sigma DoG of
+    difference_of_gaussians; the scale estimate uses the whole stack up to
+    SCALE_SIGMA_MAX. origin is the raster's (row, col) offset in a larger
+    grid it was cut from.
+    """
+    track = _ScaleTracker(raster.shape)
+    dog = np.zeros(raster.shape, dtype=np.float32)
+    for i, (band, grid) in enumerate(_scale_bands(raster, origin)):
+        if i < BLOB_SCALES:
+            dog += band
+        track.add(_full_res(band, grid, raster.shape))
+    return dog * _layer_weight(settings), track.code()
 
-    sm1 = gaussian_filter(raster, sigma=1.2)
-    sm2 = gaussian_filter(raster, sigma=6.0)
-    dog = (sm1 - sm2) * w
+def normalize_heatmap(dog: np.ndarray) -> np.ndarray:
     dog = (dog - dog.min()) / (dog.max() - dog.min() + 1e-6)
     return dog.astype(np.float32)
 
+def compute_anomaly_heatmap(raster: np.ndarray, settings: dict) -> np.ndarray:
+    """Return 0..1 anomaly heatmap (demo)."""
+    return normalize_heatmap(difference_of_gaussians(raster, settings))
+
+def _blocks(H: int, W: int, block: int, halo: int):
+    for r0 in range(0, H, block):
+        for c0 in range(0, W, block):
+            r1, c1 = min(H, r0 + block), min(W, c0 + block)
+            yield (r0, r1, c0, c1), (max(0, r0 - halo), min(H, r1 + halo), max(0, c0 - halo), min(W, c1 + halo))
+
+def compute_anomaly_heatmap_chunked(src, out_path: str, settings: dict, block: int = 1024, workers: int | None = None,
+                                    shape=None):
+    """Block-wise scale_space_dog of a 2D raster into a memory-mapped .npy heatmap; returns (heatmap, scale codes).
+
+    src is an array, a memmap, a .npy path, or a callable (r0, r1, c0, c1)
+    -> float32 window, which needs shape=(H, W). Each block is read with a
+    halo of DOG_HALO_PX and blocks are filtered in worker threads, so the
+    result matches one compute_anomaly_heatmap pass while only `workers`
+    blocks are held in RAM at once.
+    """
+    if isinstance(src, (str, os.PathLike)):
+        src = np.load(src, mmap_mode="r")
+    if callable(src):
+        read, (H, W) = src, shape
+    else:
+        read, (H, W) = (lambda w: np.asarray(src[w[0]:w[1], w[2]:w[3]], dtype=np.float32)), src.shape
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float32, shape=(H, W))
+    codes = np.empty((H, W), dtype=np.uint8)
+    blocks = list(_blocks(H, W, block, DOG_HALO_PX))
+
+    def _dog_block(b):
+        (r0, r1, c0, c1), (hr0, hr1, hc0, hc1) = b
+        dog, code = scale_space_dog(read((hr0, hr1, hc0, hc1)), settings, origin=(hr0, hc0))
+        core = (slice(r0 - hr0, r1 - hr0), slice(c0 - hc0, c1 - hc0))
+        out[r0:r1, c0:c1] = dog[core]
+        codes[r0:r1, c0:c1] = code[core]
+        return float(dog[core].min()), float(dog[core].max())
+
+    def _norm_block(b, mn, span):
+        (r0, r1, c0, c1), _ = b
+        view = out[r0:r1, c0:c1]
+        view -= mn
+        view /= span
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        ranges = list(pool.map(_dog_block, blocks))
+        mn = min(r[0] for r in ranges)
+        span = max(r[1] for r in ranges) - mn + 1e-6
+        list(pool.map(lambda b: _norm_block(b, mn, span), blocks))
+    out.flush()
+    return out, codes
+
 def pick_anomaly_points(heatmap: np.ndarray, top_k: int = 35, min_dist_px: int = 10):
     H, W = heatmap.shape
     hm = heatmap.copy()
@@ -33,3 +199,53 @@ def pick_anomaly_points(heatmap: np.ndarray, top_k: int = 35, min_dist_px: int =
         c0, c1 = max(0, c-min_dist_px), min(W, c+min_dist_px)
         hm[r0:r1, c0:c1] = -1
     return points
+
+MAD_TO_SIGMA = 1.4826
+
+def extract_anomaly_regions(heatmap: np.ndarray, k: float = 3.0, min_area_px: int = 4):
+    """All connected regions whose robust z-score (median/MAD) exceeds +-k; linear in grid size.
+
+    Regions above the median are POS, below are NEG. Each region reports its
+    peak (row/col/score/z_rel), area and centroid, strongest first.
+    """
+    H, W = heatmap.shape
+    med = float(np.median(heatmap))
+    mad = float(np.median(np.abs(heatmap - med))) * MAD_TO_SIGMA + 1e-9
+    z = (heatmap - med) / mad
+
+    eight = np.ones((3, 3), dtype=bool)
+    lab, npos = label(z > k, structure=eight)
+    neg, nneg = label(z < -k, structure=eight)
+    lab[neg > 0] = neg[neg > 0] + npos
+    n = npos + nneg
+    if n == 0:
+        return []
+
+    idx = np.flatnonzero(lab)
+    l = lab.ravel()[idx]
+    zl = np.abs(z.ravel()[idx])
+    rows, cols = idx // W, idx % W
+    area = np.bincount(l, minlength=n + 1)
+    cr = np.bincount(l, weights=rows, minlength=n + 1) / np.maximum(area, 1)
+    cc = np.bincount(l, weights=cols, minlength=n + 1) / np.maximum(area, 1)
+    peak = np.zeros(n + 1)
+    np.maximum.at(peak, l, zl)
+    at_peak = zl == peak[l]
+    peak_idx = np.full(n + 1, H * W, dtype=np.int64)
+    np.minimum.at(peak_idx, l[at_peak], idx[at_peak])
+
+    regions = []
+    for i in np.argsort(-peak[1:]) + 1:
+        if area[i] < min_area_px:
+            continue
+        r, c = divmod(int(peak_idx[i]), W)
+        regions.append({
+            "row": r, "col": c,
+            "score": round(float(heatmap[r, c]), 5),
+            "polarity": "POS" if i <= npos else "NEG",
+            "z_rel": round(float(z[r, c]), 3),
+            "area_px": int(area[i]),
+            "centroid_row": round(float(cr[i]), 2),
+            "centroid_col": round(float(cc[i]), 2),
+        })
+    return regions
@@ -0,0 +1,85 @@
+from shapely.geometry import box
+from .analysis import band_sigma, normalize_heatmap
+from .geo import georef_from_bounds
+from .grid import GridPlan, plan_grid, MIN_GRID_PX, DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
+from .pipeline import _compute_grid, _anomaly_points, _result
+from .roi import roi_from_bbox
+
+MAX_MERGE_WASTE = 2.0  # merged box may be at most this many times the parts' summed area
+
+def merge_boxes(bounds: list, max_waste: float = MAX_MERGE_WASTE) -> list:
+    """Greedily merge (minx, miny, maxx, maxy) boxes into fetch groups -> [(bounds, [indices])].
+
+    Two groups merge when their boxes overlap or when the merged box wastes
+    little area (union box <= max_waste * the two boxes' area).
+    """
+    groups = [(tuple(b), [i]) for i, b in enumerate(bounds)]
+    merged = True
+    while merged:
+        merged = False
+        for a in range(len(groups)):
+            for b in range(a + 1, len(groups)):
+                ba, bb = box(*groups[a][0]), box(*groups[b][0])
+                u = ba.union(bb).envelope
+                if ba.intersects(bb) or u.area <= max_waste * (ba.area + bb.area):
+                    groups[a] = (u.bounds, groups[a][1] + groups[b][1])
+                    del groups[b]
+                    merged = True
+                    break
+            if merged:
+                break
+    return groups
+
+def _crop_window(roi_bounds, georef):
+    """Pixel window (r0, r1, c0, c1) of the group grid covering the ROI bbox, at least MIN_GRID_PX a side."""
+    H, W = georef["H"], georef["W"]
+    dx = (georef["lon_max"] - georef["lon_min"]) / (W - 1)
+    dy = (georef["lat_max"] - georef["lat_min"]) / (H - 1)
+    minx, miny, maxx, maxy = roi_bounds
+    c0, c1 = round((minx - georef["lon_min"]) / dx), round((maxx - georef["lon_min"]) / dx) + 1
+    r0, r1 = round((georef["lat_max"] - maxy) / dy), round((georef["lat_max"] - miny) / dy) + 1
+
+    def _grow(a0, a1, n):
+        need = min(n, MIN_GRID_PX) - (a1 - a0)
+        if need > 0:
+            a0 -= need // 2
+            a1 += need - need // 2
+        shift = max(0, -a0) - max(0, a1 - n)
+        return max(0, a0 + shift), min(n, a1 + shift)
+
+    r0, r1 = _grow(max(0, r0), min(H, r1), H)
+    c0, c1 = _grow(max(0, c0), min(W, c1), W)
+    return r0, r1, c0, c1
+
+def run_batch_scan(rois: list, settings: dict, use_real_data: bool = False,
+                   target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB,
+                   extraction: str = "peaks", local_rasters: dict | None = None, max_waste: float = MAX_MERGE_WASTE) -> list:
+    """Scan several ROIs with one fetch + DoG per merged group; returns one result per ROI, in input order.
+
+    Each ROI's heatmap is cropped from its group's DoG and renormalized, so
+    overlapping ROIs share the fetched pixels and the filtering work, and ROI
+    edges see real context instead of a boundary. result["batch"] tells which
+    group an ROI was served from.
+    """
+    fetch_kw = dict(use_real_data=use_real_data, local_rasters=local_rasters)
+    groups = merge_boxes([r.polygon.bounds for r in rois], max_waste)
+    results = [None] * len(rois)
+    for gi, (gbounds, members) in enumerate(groups):
+        groi = roi_from_bbox(*gbounds)
+        plan = plan_grid(groi, target_m_per_px=target_m_per_px, mem_budget_mb=mem_budget_mb)
+        raster, heatmap, scale_idx, georef = _compute_grid(groi, plan, settings, fetch_kw)
+        for i in members:
+            r0, r1, c0, c1 = _crop_window(rois[i].polygon.bounds, georef)
+            to_ll = georef["pixel_to_latlon"]
+            lat_max, lon_min = to_ll(r0, c0)
+            lat_min, lon_max = to_ll(r1 - 1, c1 - 1)
+            sub_geo = georef_from_bounds(lon_min, lat_min, lon_max, lat_max, r1 - r0, c1 - c0)
+            sub_heat = normalize_heatmap(heatmap[r0:r1, c0:c1])
+            sub_idx = scale_idx[r0:r1, c0:c1]
+            sub_plan = GridPlan(H=r1 - r0, W=c1 - c0, m_per_px=plan.m_per_px, tile_px=0, halo=plan.halo)
+            pts = _anomaly_points(sub_heat, sub_geo, plan.m_per_px, lambda r, c, idx=sub_idx: band_sigma(idx[r, c]), extraction)
+            sub_raster = None if raster is None else raster[r0:r1, c0:c1].copy()
+            results[i] = _result(rois[i], sub_heat, sub_raster, pts, sub_geo, sub_plan)
+            results[i]["batch"] = {"group": gi, "groups": len(groups), "group_size": len(members),
+                                   "group_grid": [plan.H, plan.W]}
+    return results
@@ -0,0 +1,79 @@
+import sys
+from dataclasses import dataclass
+import numpy as np
+
+COMPACT_DTYPES = ("uint8", "float16")
+_NAN_U8 = 255  # uint8 code reserved for NaN; valid values use 0..254
+
+@dataclass(frozen=True)
+class QuantizedGrid:
+    """A grid stored as uint8 (value = code * scale + offset) or float16."""
+    data: np.ndarray
+    scale: float = 1.0
+    offset: float = 0.0
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def dequantize(self) -> np.ndarray:
+        if self.data.dtype == np.float16:
+            return self.data.astype(np.float32)
+        out = self.data.astype(np.float32) * np.float32(self.scale) + np.float32(self.offset)
+        out[self.data == _NAN_U8] = np.nan
+        return out
+
+def quantize_grid(a: np.ndarray, dtype: str = "uint8") -> QuantizedGrid:
+    """uint8 keeps the grid to within (max - min) / 508; float16 to ~3 significant digits."""
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(f"Desteklenmeyen kompakt tip: {dtype}")
+    a = np.asarray(a, dtype=np.float32)
+    if dtype == "float16":
+        return QuantizedGrid(a.astype(np.float16))
+    finite = np.isfinite(a)
+    if not finite.any():
+        return QuantizedGrid(np.full(a.shape, _NAN_U8, dtype=np.uint8))
+    lo, hi = float(a[finite].min()), float(a[finite].max())
+    scale = (hi - lo) / (_NAN_U8 - 1) or 1.0
+    q = np.full(a.shape, _NAN_U8, dtype=np.uint8)
+    q[finite] = np.rint((a[finite] - lo) / scale).astype(np.uint8)
+    return QuantizedGrid(q, scale, lo)
+
+def grid_of(result: dict, key: str = "heatmap"):
+    """result[key] as float32, dequantizing compact results on demand (None if absent)."""
+    v = result.get(key)
+    return v.dequantize() if isinstance(v, QuantizedGrid) else v
+
+def compact_result(result: dict, dtype: str = "uint8") -> dict:
+    """Copy of a scan result without the fused raster and with quantized grids.
+
+    Anomaly points, georef and grid info are kept as is, so reports built
+    from the compact result match the full one.
+    """
+    out = dict(result, raster=None, compact=dtype)
+    for key in ("heatmap", "change_heatmap"):
+        v = result.get(key)
+        if isinstance(v, np.ndarray):
+            out[key] = quantize_grid(v, dtype)
+    return out
+
+def deep_nbytes(obj, _seen=None) -> int:
+    """Approximate memory held by a result/report: array buffers plus Python containers."""
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, QuantizedGrid):
+        return obj.nbytes
+    n = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        n += sum(deep_nbytes(k, _seen) + deep_nbytes(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        n += sum(deep_nbytes(v, _seen) for v in obj)
+    return n
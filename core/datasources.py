@@ -1,54 +1,209 @@
+import os
 import numpy as np
 from .roi import ROI
+from .telemetry import PUBudgetExceeded
 
-def _zscore(x: np.ndarray) -> np.ndarray:
-    m = np.nanmean(x)
-    s = np.nanstd(x) + 1e-6
-    return (x - m) / s
+def fuse_bands(bands, shape, stats=None) -> np.ndarray:
+    """NaN-aware mean of z-scored bands, renormalized; keeps only a float32 sum and a uint8 count.
 
-def get_raster_for_roi(roi: ROI, size: int = 256, settings: dict | None = None, use_real_data: bool = False) -> np.ndarray:
+    stats, a (mean, std) per band, z-scores windows of a larger grid with
+    the grid's statistics (see grid_band_stack); the result is then left
+    unrenormalized so all windows share one scale.
+    """
+    acc = np.zeros(shape, dtype=np.float32)
+    cnt = np.zeros(shape, dtype=np.uint8)
+    valid = np.empty(shape, dtype=bool)
+    n = 0
+    for band in bands:
+        z = np.array(band, dtype=np.float32)
+        mean, std = stats[n] if stats is not None else (np.nanmean(z), np.nanstd(z))
+        z -= mean
+        z /= std + 1e-6
+        np.isfinite(z, out=valid)
+        np.add(acc, z, out=acc, where=valid)
+        cnt += valid
+        n += 1
+        del z
+    if n == 0:
+        raise RuntimeError("no_features_enabled")
+
+    np.divide(acc, cnt, out=acc, where=cnt > 0)
+    acc[cnt == 0] = 0.0
+    if stats is not None:
+        return acc
+    acc -= acc.mean()
+    acc /= acc.std() + 1e-6
+    return acc
+
+def _layer_bands(bbox, H: int, W: int, settings: dict, use_real_data: bool, incremental: bool, local_rasters: dict | None):
+    """Yield (layer, band) pairs: Sentinel layers by settings key, then local rasters by name."""
+
+    def _sentinel_bands():
+        from .sentinelhub_fetch import have_credentials, fetch_s1_vv_vh, fetch_s2_indices, fetch_landsat_thermal
+        if not have_credentials():
+            return
+
+        def fetch_cached(layer, fn):
+            # viewport prefetch may already hold a covering, fine enough fetch
+            from .prefetch import prefetch_cache
+            hit = prefetch_cache().lookup(layer, bbox, (W, H))
+            return hit if hit is not None else fn(bbox, size=(W, H))
+
+        def fetch_incremental(layer, fn):
+            from .fetch_store import FetchStore
+            return FetchStore().fetch_incremental(layer, fn, bbox, (W, H))
+
+        fetch = fetch_incremental if incremental else fetch_cached
+
+        # one layer's fetch is alive at a time; bands stream to the consumer
+        if settings.get("radar"):
+            a = fetch("s1", fetch_s1_vv_vh)
+            yield from (("radar", a[..., i]) for i in range(a.shape[-1]))
+            del a
+        if settings.get("optic"):
+            a = fetch("s2", fetch_s2_indices)
+            yield from (("optic", a[..., i]) for i in range(a.shape[-1]))
+            del a
+        if settings.get("thermal"):
+            a = fetch("thermal", fetch_landsat_thermal)
+            yield "thermal", a[..., 0]
+
+    if use_real_data:
+        yield from _sentinel_bands()
+    if local_rasters:
+        from .local_raster import read_local_window
+        for name, path in local_rasters.items():
+            yield name, read_local_window(path, bbox, (H, W))
+
+def _demo_rows(H: int, W: int, seed: int = 42, chunk_rows: int = 0):
+    """Yield (r0, r1, rows) of the unnormalized demo field in row chunks, equal to one full-size draw."""
+    chunk = chunk_rows if 0 < chunk_rows < H else H
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(0, 1, (H, W)).astype(np.float32) if chunk == H else None
+    if noise is None:
+        # the blob parameters come after the noise in the stream: skip past it, then redraw it chunk by chunk
+        for r0 in range(0, H, chunk):
+            rng.normal(0, 1, (min(H, r0 + chunk) - r0, W))
+        noise_rng = np.random.default_rng(seed)
+    blobs = []
+    for _ in range(6):
+        cx, cy = rng.integers(0, (W, H))
+        blobs.append((cx, cy, rng.uniform(W*0.05, W*0.18), rng.uniform(H*0.05, H*0.18), rng.uniform(-4, 4)))
+    x = np.arange(W)
+    for r0 in range(0, H, chunk):
+        r1 = min(H, r0 + chunk)
+        base = noise if noise is not None else noise_rng.normal(0, 1, (r1 - r0, W)).astype(np.float32)
+        y = np.arange(r0, r1)[:, None]
+        for cx, cy, sx, sy, amp in blobs:
+            base += amp * np.exp(-(((x-cx)**2)/(2*sx**2) + ((y-cy)**2)/(2*sy**2))).astype(np.float32)
+        yield r0, r1, base
+
+def _demo_raster(H: int, W: int, seed: int = 42) -> np.ndarray:
+    _, _, base = next(_demo_rows(H, W, seed))
+    base = (base - base.mean()) / (base.std() + 1e-6)
+    return base.astype(np.float32)
+
+def _moments(sums) -> list:
+    """[(mean, std)] from per-band [count, sum, sum of squares] rows."""
+    out = []
+    for n, s, ss in sums:
+        mean = s / max(n, 1.0)
+        out.append((np.float32(mean), np.float32(np.sqrt(max(ss / max(n, 1.0) - mean * mean, 0.0)))))
+    return out
+
+def grid_band_stack(H: int, W: int, windows, window_bbox, settings: dict, dirpath: str, use_real_data: bool = False,
+                    incremental: bool = False, local_rasters: dict | None = None):
+    """Fetch a grid window by window into disk-backed (H, W) float32 bands under dirpath.
+
+    Returns (bands, stats) with stats the grid-wide (mean, std) of each band,
+    so windows fused with them (fuse_bands(..., stats=stats)) join without
+    seams. window_bbox maps an (r0, r1, c0, c1) window to its lon/lat bbox.
+    Falls back to one demo field over the whole grid when nothing can be
+    fetched, as get_raster_for_roi does for a single pass.
+    """
+    from numpy.lib.format import open_memmap
+    windows = list(windows)
+    if use_real_data or local_rasters:
+        try:
+            bands, sums = [], []
+            for k, (r0, r1, c0, c1) in enumerate(windows):
+                i = -1
+                for i, (_, band) in enumerate(_layer_bands(window_bbox((r0, r1, c0, c1)), r1 - r0, c1 - c0, settings,
+                                                           use_real_data, incremental, local_rasters)):
+                    if k == 0:
+                        bands.append(open_memmap(os.path.join(dirpath, f"band{i}.npy"), mode="w+", dtype=np.float32, shape=(H, W)))
+                        sums.append(np.zeros(3))
+                    elif i >= len(bands):
+                        raise RuntimeError("band_count_mismatch")
+                    bands[i][r0:r1, c0:c1] = band
+                    v = np.asarray(band, dtype=np.float64)
+                    v = v[np.isfinite(v)]
+                    sums[i] += (v.size, v.sum(), np.dot(v, v))
+                    del band, v
+                if not bands or i + 1 != len(bands):
+                    raise RuntimeError("no_features_enabled" if not bands else "band_count_mismatch")
+            return bands, _moments(sums)
+        except PUBudgetExceeded:
+            raise
+        except Exception:
+            pass
+
+    # DEMO fallback, generated once for the whole grid in tile-height row chunks
+    demo = open_memmap(os.path.join(dirpath, "demo.npy"), mode="w+", dtype=np.float32, shape=(H, W))
+    sums = np.zeros(3)
+    for r0, r1, rows in _demo_rows(H, W, chunk_rows=max(r1 - r0 for r0, r1, _, _ in windows)):
+        demo[r0:r1] = rows
+        v = rows.astype(np.float64)
+        sums += (v.size, v.sum(), np.dot(v.ravel(), v.ravel()))
+    return [demo], _moments([sums])
+
+def get_raster_for_roi(roi: ROI, size: int | tuple[int, int] = 256, settings: dict | None = None, use_real_data: bool = False,
+                       incremental: bool = False, local_rasters: dict | None = None) -> np.ndarray:
+    """Fused, normalized raster for the ROI bbox; falls back to demo data when nothing can be fetched.
+
+    local_rasters maps layer names (e.g. "magnetic", "dem") to local raster
+    paths; each is read windowed over the bbox and fused like a Sentinel band.
+    """
     if settings is None:
         settings = dict(radar=True, optic=True, thermal=False, magnetic=False)
+    H, W = (size, size) if isinstance(size, int) else (int(size[0]), int(size[1]))
 
-    if use_real_data:
+    if use_real_data or local_rasters:
         try:
-            from .sentinelhub_fetch import have_credentials, fetch_s1_vv_vh, fetch_s2_indices, fetch_landsat_thermal
-            if not have_credentials():
-                raise RuntimeError("no_credentials")
-
-            minx, miny, maxx, maxy = roi.polygon.bounds
-            bbox = (float(minx), float(miny), float(maxx), float(maxy))
-
-            feats = []
-            if settings.get("radar"):
-                s1 = fetch_s1_vv_vh(bbox, size=(size, size))
-                feats += [_zscore(s1[...,0]), _zscore(s1[...,1])]
-            if settings.get("optic"):
-                s2 = fetch_s2_indices(bbox, size=(size, size))
-                for i in range(s2.shape[-1]):
-                    feats.append(_zscore(s2[...,i]))
-            if settings.get("thermal"):
-                th = fetch_landsat_thermal(bbox, size=(size, size))[...,0]
-                feats.append(_zscore(th))
-
-            if len(feats) == 0:
-                raise RuntimeError("no_features_enabled")
-
-            fused = np.nanmean(np.stack(feats, axis=0), axis=0).astype(np.float32)
-            fused = (fused - fused.mean()) / (fused.std() + 1e-6)
-            return fused.astype(np.float32)
+            bbox = tuple(float(v) for v in roi.polygon.bounds)
+            bands = (b for _, b in _layer_bands(bbox, H, W, settings, use_real_data, incremental, local_rasters))
+            return fuse_bands(bands, (H, W))
+        except PUBudgetExceeded:
+            raise  # quota is a hard stop, not a reason to show demo data
         except Exception:
             pass
 
     # DEMO fallback
-    rng = np.random.default_rng(42)
-    base = rng.normal(0, 1, (size, size)).astype(np.float32)
-    y, x = np.mgrid[0:size, 0:size]
-    for _ in range(6):
-        cx, cy = rng.integers(0, size, 2)
-        sx = rng.uniform(size*0.05, size*0.18)
-        sy = rng.uniform(size*0.05, size*0.18)
-        amp = rng.uniform(-4, 4)
-        base += amp * np.exp(-(((x-cx)**2)/(2*sx**2) + ((y-cy)**2)/(2*sy**2))).astype(np.float32)
-    base = (base - base.mean()) / (base.std() + 1e-6)
-    return base.astype(np.float32)
+    return _demo_raster(H, W)
+
+DEMO_LAYER_SEEDS = {"radar": 7, "optic": 11, "thermal": 13, "magnetic": 17}
+
+def get_layer_bands_for_roi(roi: ROI, size: tuple[int, int], settings: dict, use_real_data: bool = False,
+                            local_rasters: dict | None = None) -> dict:
+    """Bands per layer (layer -> list of (H, W) arrays) for the ROI bbox, e.g. for layer ablation.
+
+    Without real data each enabled layer gets its own demo raster: a shared
+    field (the normal demo raster) plus layer-specific anomalies.
+    """
+    H, W = int(size[0]), int(size[1])
+    layers = {}
+    if use_real_data or local_rasters:
+        try:
+            bbox = tuple(float(v) for v in roi.polygon.bounds)
+            for name, band in _layer_bands(bbox, H, W, settings, use_real_data, False, local_rasters):
+                layers.setdefault(name, []).append(np.asarray(band, dtype=np.float32))
+        except PUBudgetExceeded:
+            raise
+        except Exception:
+            layers = {}
+    if not layers:
+        shared = _demo_raster(H, W)
+        for name, seed in DEMO_LAYER_SEEDS.items():
+            if settings.get(name):
+                layers[name] = [0.5 * shared + _demo_raster(H, W, seed)]
+    return layers
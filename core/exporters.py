@@ -1,14 +1,17 @@
 import os
+import io
 import json
+import struct
+import zipfile
+from xml.sax.saxutils import escape
 import numpy as np
-import rasterio
-from rasterio.transform import from_bounds
-import simplekml
-import ezdxf
+from .compact import grid_of
 
 def _ensure_dir(d): os.makedirs(d, exist_ok=True)
 
-def export_geotiff(heatmap: np.ndarray, georef: dict, out_path: str):
+def _geotiff_profile(heatmap: np.ndarray, georef: dict) -> dict:
+    import rasterio
+    from rasterio.transform import from_bounds
     H, W = heatmap.shape
     transform = from_bounds(georef["lon_min"], georef["lat_min"], georef["lon_max"], georef["lat_max"], W, H)
     profile = {
@@ -20,113 +23,241 @@ def export_geotiff(heatmap: np.ndarray, georef: dict, out_path: str):
         "transform": transform,
         "compress": "LZW",
     }
-    with rasterio.open(out_path, "w", **profile) as dst:
+    return profile
+
+def export_geotiff(heatmap: np.ndarray, georef: dict, out_path: str):
+    import rasterio
+    with rasterio.open(out_path, "w", **_geotiff_profile(heatmap, georef)) as dst:
         dst.write(heatmap.astype(np.float32), 1)
     return out_path
 
-def export_esri_ascii_grid(heatmap: np.ndarray, georef: dict, out_path: str):
+def _write_geotiff(f, heatmap: np.ndarray, georef: dict):
+    from rasterio.io import MemoryFile
+    with MemoryFile() as mem:
+        with mem.open(**_geotiff_profile(heatmap, georef)) as dst:
+            dst.write(heatmap.astype(np.float32), 1)
+        f.write(mem.read())
+
+def _cell_size(heatmap: np.ndarray, georef: dict):
+    """(x, y) pixel size of the grid in degrees; pixels span the bounds edge to edge, as in the GeoTIFF export."""
     H, W = heatmap.shape
-    cellsize_x = (georef["lon_max"] - georef["lon_min"]) / (W-1)
-    cellsize_y = (georef["lat_max"] - georef["lat_min"]) / (H-1)
-    cellsize = float((cellsize_x + cellsize_y) / 2.0)
-    data = np.flipud(heatmap)  # origin lower-left
+    return (georef["lon_max"] - georef["lon_min"]) / W, (georef["lat_max"] - georef["lat_min"]) / H
+
+def _write_esri_ascii_grid(f, heatmap: np.ndarray, georef: dict):
+    H, W = heatmap.shape
+    dx, dy = _cell_size(heatmap, georef)
+    data = heatmap  # rows run north to south; xll/yll only place the grid
 
     header = [
         f"ncols         {W}",
         f"nrows         {H}",
-        f"xllcorner     {georef['lon_min']}",
-        f"yllcorner     {georef['lat_min']}",
-        f"cellsize      {cellsize}",
-        f"NODATA_value  -9999",
+        f"xllcorner     {georef['lon_min']!r}",
+        f"yllcorner     {georef['lat_min']!r}",
     ]
+    # square cells use the standard key; otherwise the dx/dy extension that GDAL reads
+    if abs(dx - dy) <= 1e-12 * max(dx, dy):
+        header.append(f"cellsize      {dx!r}")
+    else:
+        header += [f"dx            {dx!r}", f"dy            {dy!r}"]
+    header.append("NODATA_value  -9999")
+    f.write("\n".join(header) + "\n")
+    for r in range(H):
+        f.write(" ".join(f"{v:.6f}" for v in data[r]) + "\n")
+
+def export_esri_ascii_grid(heatmap: np.ndarray, georef: dict, out_path: str):
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(header) + "\n")
-        for r in range(H):
-            f.write(" ".join(f"{v:.6f}" for v in data[r]) + "\n")
+        _write_esri_ascii_grid(f, heatmap, georef)
     return out_path
 
-def export_surfer_dsaa_grid(heatmap: np.ndarray, georef: dict, out_path: str):
+def _write_surfer_dsaa_grid(f, heatmap: np.ndarray, georef: dict):
     H, W = heatmap.shape
     zmin, zmax = float(np.min(heatmap)), float(np.max(heatmap))
     xlo, xhi = georef["lon_min"], georef["lon_max"]
     ylo, yhi = georef["lat_min"], georef["lat_max"]
 
+    f.write("DSAA\n")
+    f.write(f"{W} {H}\n")
+    f.write(f"{xlo} {xhi}\n")
+    f.write(f"{ylo} {yhi}\n")
+    f.write(f"{zmin} {zmax}\n")
+    data = np.flipud(heatmap)
+    for r in range(H):
+        for c0 in range(0, W, 10):
+            chunk = data[r, c0:c0+10]
+            f.write(" ".join(f"{v:.6f}" for v in chunk) + "\n")
+
+def export_surfer_dsaa_grid(heatmap: np.ndarray, georef: dict, out_path: str):
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write("DSAA\n")
-        f.write(f"{W} {H}\n")
-        f.write(f"{xlo} {xhi}\n")
-        f.write(f"{ylo} {yhi}\n")
-        f.write(f"{zmin} {zmax}\n")
-        data = np.flipud(heatmap)
-        for r in range(H):
-            for c0 in range(0, W, 10):
-                chunk = data[r, c0:c0+10]
-                f.write(" ".join(f"{v:.6f}" for v in chunk) + "\n")
+        _write_surfer_dsaa_grid(f, heatmap, georef)
     return out_path
 
-def export_xyz_csv(points: list, out_path: str):
+_SURFER7_BLANK = 1.70141e38
+_ROW_BLOCK = 512
+
+def _write_surfer7_grid(f, heatmap: np.ndarray, georef: dict):
+    H, W = heatmap.shape
+    xlo, xhi = georef["lon_min"], georef["lon_max"]
+    ylo, yhi = georef["lat_min"], georef["lat_max"]
+    f.write(struct.pack("<4sii", b"DSRB", 4, 1))
+    f.write(struct.pack("<4siii", b"GRID", 72, H, W))
+    f.write(struct.pack("<8d", xlo, ylo, (xhi - xlo) / (W-1), (yhi - ylo) / (H-1),
+                        float(np.min(heatmap)), float(np.max(heatmap)), 0.0, _SURFER7_BLANK))
+    f.write(struct.pack("<4si", b"DATA", H * W * 8))
+    # rows start at ymin; convert in row blocks to bound the float64 copy
+    for r1 in range(H, 0, -_ROW_BLOCK):
+        f.write(np.ascontiguousarray(heatmap[max(0, r1 - _ROW_BLOCK):r1][::-1], dtype="<f8").tobytes())
+
+def export_surfer7_grid(heatmap: np.ndarray, georef: dict, out_path: str):
+    with open(out_path, "wb") as f:
+        _write_surfer7_grid(f, heatmap, georef)
+    return out_path
+
+def _esri_flt_header(heatmap: np.ndarray, georef: dict) -> str:
+    """EHdr header: ULXMAP/ULYMAP are the centre of the upper-left pixel, XDIM/YDIM the separate x and y sizes."""
+    H, W = heatmap.shape
+    dx, dy = _cell_size(heatmap, georef)
+    return "\n".join([
+        f"NROWS         {H}",
+        f"NCOLS         {W}",
+        "NBANDS        1",
+        "NBITS         32",
+        "PIXELTYPE     FLOAT",
+        "BYTEORDER     I",
+        "LAYOUT        BIL",
+        f"ULXMAP        {georef['lon_min'] + dx / 2!r}",
+        f"ULYMAP        {georef['lat_max'] - dy / 2!r}",
+        f"XDIM          {dx!r}",
+        f"YDIM          {dy!r}",
+        "NODATA        -9999",
+    ]) + "\n"
+
+def _write_esri_flt(f, heatmap: np.ndarray):
+    # .flt rows run north to south, same as the heatmap
+    f.write(np.ascontiguousarray(heatmap, dtype="<f4").tobytes())
+
+def export_esri_flt_grid(heatmap: np.ndarray, georef: dict, out_path: str):
+    hdr_path = os.path.splitext(out_path)[0] + ".hdr"
+    with open(hdr_path, "w", encoding="utf-8") as f:
+        f.write(_esri_flt_header(heatmap, georef))
+    with open(out_path, "wb") as f:
+        _write_esri_flt(f, heatmap)
+    return out_path, hdr_path
+
+def _write_xyz_csv(f, points):
     import csv
+    w = csv.writer(f)
+    w.writerow(["x_lon", "y_lat", "z_score", "polarity", "z_rel", "depth_m", "volume_m3"])
+    for p in points:
+        w.writerow([p["lon"], p["lat"], p["score"], p["polarity"], p["z_rel"], p.get("depth_m",""), p.get("volume_m3","")])
+
+def export_xyz_csv(points: list, out_path: str):
     with open(out_path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["x_lon", "y_lat", "z_score", "polarity", "z_rel", "depth_m", "volume_m3"])
-        for p in points:
-            w.writerow([p["lon"], p["lat"], p["score"], p["polarity"], p["z_rel"], p.get("depth_m",""), p.get("volume_m3","")])
+        _write_xyz_csv(f, points)
     return out_path
 
-def export_kml(roi, points: list, out_path: str):
-    kml = simplekml.Kml()
-    pol = kml.newpolygon(name="ROI")
-    pol.outerboundaryis = [(x,y) for x,y in list(roi.polygon.exterior.coords)]
-    pol.style.polystyle.color = simplekml.Color.changealphaint(60, simplekml.Color.blue)
+_KML_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document>
+<Style id="roi"><PolyStyle><color>3cff0000</color></PolyStyle></Style>
+<Style id="POS"><IconStyle><color>ff0000ff</color></IconStyle></Style>
+<Style id="NEG"><IconStyle><color>ff008000</color></IconStyle></Style>
+"""
 
+def _write_kml(f, roi, points):
+    f.write(_KML_HEAD)
+    ring = " ".join(f"{x},{y}" for x, y in roi.polygon.exterior.coords)
+    f.write(f'<Placemark><name>ROI</name><styleUrl>#roi</styleUrl><Polygon><outerBoundaryIs><LinearRing><coordinates>{ring}</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>\n')
     for i, p in enumerate(points, 1):
-        pt = kml.newpoint(name=f"A{i} {p['polarity']}", coords=[(p["lon"], p["lat"])])
-        pt.description = f"score={p['score']}\nz_rel={p['z_rel']}"
-        pt.style.iconstyle.color = simplekml.Color.red if p["polarity"] == "POS" else simplekml.Color.green
-    kml.save(out_path)
+        pol = p["polarity"]
+        f.write(f'<Placemark><name>A{i} {escape(pol)}</name><description>score={p["score"]}\nz_rel={p["z_rel"]}</description>'
+                f'<styleUrl>#{"POS" if pol == "POS" else "NEG"}</styleUrl><Point><coordinates>{p["lon"]},{p["lat"]}</coordinates></Point></Placemark>\n')
+    f.write("</Document></kml>\n")
+
+def export_kml(roi, points, out_path: str):
+    with open(out_path, "w", encoding="utf-8") as f:
+        _write_kml(f, roi, points)
     return out_path
 
-def export_geojson(roi, points: list, out_path: str):
-    feat_roi = {
-        "type": "Feature",
-        "properties": {"name": "ROI"},
-        "geometry": {"type": "Polygon","coordinates": [[ [x,y] for x,y in list(roi.polygon.exterior.coords) ]]},
-    }
-    feat_pts = []
-    for i,p in enumerate(points,1):
-        feat_pts.append({
-            "type":"Feature",
-            "properties":{"name": f"A{i}","polarity": p["polarity"],"score": p["score"],"z_rel": p["z_rel"]},
-            "geometry":{"type":"Point","coordinates":[p["lon"], p["lat"]]},
-        })
-    fc = {"type":"FeatureCollection","features":[feat_roi]+feat_pts}
+def _write_kmz(f, roi, points):
+    with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open("doc.kml", "w") as raw, io.TextIOWrapper(raw, encoding="utf-8") as t:
+            _write_kml(t, roi, points)
+
+def export_kmz(roi, points, out_path: str):
+    with open(out_path, "wb") as f:
+        _write_kmz(f, roi, points)
+    return out_path
+
+def _write_geojson(f, roi, points):
+    ring = [[x, y] for x, y in roi.polygon.exterior.coords]
+    f.write('{"type":"FeatureCollection","features":[\n')
+    f.write(json.dumps({"type": "Feature", "properties": {"name": "ROI"}, "geometry": {"type": "Polygon", "coordinates": [ring]}}, ensure_ascii=False))
+    for i, p in enumerate(points, 1):
+        f.write(',\n{"type":"Feature","properties":')
+        f.write(json.dumps({"name": f"A{i}", "polarity": p["polarity"], "score": p["score"], "z_rel": p["z_rel"]}, ensure_ascii=False))
+        f.write(f',"geometry":{{"type":"Point","coordinates":[{p["lon"]},{p["lat"]}]}}}}')
+    f.write("\n]}\n")
+
+def export_geojson(roi, points, out_path: str):
     with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(fc, f, ensure_ascii=False, indent=2)
+        _write_geojson(f, roi, points)
     return out_path
 
-def export_dxf(roi, points: list, out_path: str):
-    doc = ezdxf.new(dxfversion="R2010")
-    msp = doc.modelspace()
-    coords = list(roi.polygon.exterior.coords)
-    msp.add_lwpolyline([(x,y) for x,y in coords], close=True, dxfattribs={"layer":"ROI"})
-    for p in points:
-        msp.add_point((p["lon"], p["lat"]), dxfattribs={"layer": f"ANOM_{p['polarity']}"})
-    doc.saveas(out_path)
+def _write_dxf(f, roi, points):
+    from ezdxf.addons import r12writer
+    with r12writer(f) as dxf:
+        dxf.add_polyline(list(roi.polygon.exterior.coords), closed=True, layer="ROI")
+        for p in points:
+            dxf.add_point((p["lon"], p["lat"]), layer=f"ANOM_{p['polarity']}")
+
+def export_dxf(roi, points, out_path: str):
+    with open(out_path, "w", encoding="utf-8") as f:
+        _write_dxf(f, roi, points)
     return out_path
 
+# label -> ((file name, binary, writer(f, result)), ...): every file a format needs; order is the export order
+EXPORT_FORMATS = {
+    "GeoTIFF": (("heatmap.tif", True, lambda f, r: _write_geotiff(f, grid_of(r), r["georef"])),),
+    "ESRI_ASCII": (("heatmap.asc", False, lambda f, r: _write_esri_ascii_grid(f, grid_of(r), r["georef"])),),
+    "Surfer_GRD": (("heatmap.grd", False, lambda f, r: _write_surfer_dsaa_grid(f, grid_of(r), r["georef"])),),
+    "Surfer7_GRD": (("heatmap_s7.grd", True, lambda f, r: _write_surfer7_grid(f, grid_of(r), r["georef"])),),
+    # a .flt is unreadable without its .hdr, so they are one format
+    "ESRI_FLT": (("heatmap.flt", True, lambda f, r: _write_esri_flt(f, grid_of(r))),
+                 ("heatmap.hdr", False, lambda f, r: f.write(_esri_flt_header(grid_of(r), r["georef"])))),
+    "XYZ_CSV": (("anomalies_xyz.csv", False, lambda f, r: _write_xyz_csv(f, r["anomaly_points"])),),
+    "KML": (("roi_and_anomalies.kml", False, lambda f, r: _write_kml(f, r["roi"], r["anomaly_points"])),),
+    "KMZ": (("roi_and_anomalies.kmz", True, lambda f, r: _write_kmz(f, r["roi"], r["anomaly_points"])),),
+    "GeoJSON": (("roi_and_anomalies.geojson", False, lambda f, r: _write_geojson(f, r["roi"], r["anomaly_points"])),),
+    "DXF": (("roi_and_anomalies.dxf", False, lambda f, r: _write_dxf(f, r["roi"], r["anomaly_points"])),),
+}
+
+def export_zip_bytes(result: dict, formats=None, compresslevel: int = 6) -> bytes:
+    """All (or the selected) export formats as one in-memory ZIP; nothing touches the disk.
+
+    Each file is streamed straight into its deflated ZIP entry, so only the
+    compressed bundle is held in memory.
+    """
+    labels = list(EXPORT_FORMATS) if formats is None else [k for k in EXPORT_FORMATS if k in set(formats)]
+    if not labels:
+        raise ValueError("Dışa aktarım için en az bir format seçin.")
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+        for name, binary, write in (spec for label in labels for spec in EXPORT_FORMATS[label]):
+            with zf.open(name, "w", force_zip64=True) as raw:
+                if binary:
+                    write(raw, result)
+                else:
+                    with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+                        write(f, result)
+    return buf.getvalue()
+
 def export_all(result: dict, exports_dir: str):
     _ensure_dir(exports_dir)
-    heatmap = result["heatmap"]
-    georef = result["georef"]
-    roi = result["roi"]
-    points = result["anomaly_points"]
-
     out = {}
-    out["GeoTIFF"] = export_geotiff(heatmap, georef, os.path.join(exports_dir, "heatmap.tif"))
-    out["ESRI_ASCII"] = export_esri_ascii_grid(heatmap, georef, os.path.join(exports_dir, "heatmap.asc"))
-    out["Surfer_GRD"] = export_surfer_dsaa_grid(heatmap, georef, os.path.join(exports_dir, "heatmap.grd"))
-    out["XYZ_CSV"] = export_xyz_csv(points, os.path.join(exports_dir, "anomalies_xyz.csv"))
-    out["KML"] = export_kml(roi, points, os.path.join(exports_dir, "roi_and_anomalies.kml"))
-    out["GeoJSON"] = export_geojson(roi, points, os.path.join(exports_dir, "roi_and_anomalies.geojson"))
-    out["DXF"] = export_dxf(roi, points, os.path.join(exports_dir, "roi_and_anomalies.dxf"))
+    for label, files in EXPORT_FORMATS.items():
+        paths = []
+        for name, binary, write in files:
+            paths.append(os.path.join(exports_dir, name))
+            with open(paths[-1], "wb") if binary else open(paths[-1], "w", encoding="utf-8", newline="") as f:
+                write(f, result)
+        out[label] = paths[0] if len(paths) == 1 else tuple(paths)
     return out
@@ -0,0 +1,76 @@
+import os
+import json
+import hashlib
+import tempfile
+import datetime as dt
+import numpy as np
+from .sentinelhub_fetch import DEFAULT_TIME_INTERVAL
+
+STORE_DIR = os.environ.get("ANOMALILAB_STORE", os.path.join(os.getcwd(), "fetch_store"))
+
+def store_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:24]
+
+def bbox_key(bbox, size) -> str:
+    return store_key([round(float(v), 7) for v in bbox], [int(v) for v in size])
+
+class FetchStore:
+    """Per-bbox composites with their last fetched date, plus the previous heatmap per scan key."""
+
+    def __init__(self, root: str = STORE_DIR):
+        self.root = root
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self.root, key, f"{name}.npz")
+
+    def load(self, key: str, name: str):
+        path = self._path(key, name)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as z:
+            return {k: z[k] for k in z.files}
+
+    def save(self, key: str, name: str, **arrays):
+        path = self._path(key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # unique temp file: Streamlit sessions are threads of one process and may save the same key at once
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def fetch_incremental(self, layer: str, fetch_fn, bbox, size, today: dt.date | None = None) -> np.ndarray:
+        """Fetch only acquisitions after the stored date and paint them over the stored composite."""
+        key = bbox_key(bbox, size)
+        today = today or dt.date.today()
+        prev = self.load(key, layer)
+        if prev is None:
+            start = DEFAULT_TIME_INTERVAL[0]
+        else:
+            last = dt.date.fromisoformat(str(prev["last_date"]))
+            if last >= today:
+                return prev["composite"]
+            start = (last + dt.timedelta(days=1)).isoformat()
+
+        new = fetch_fn(bbox, size=size, time_interval=(start, today.isoformat()))
+        # no-data pixels come back as all-zero bands (cloud mask / no acquisition)
+        valid = np.isfinite(new).all(axis=-1) & (new != 0).any(axis=-1)
+        if not valid.any():
+            # failed fetch (thermal errors return zeros) or a fully clouded window: keep last_date where it was
+            return new if prev is None else prev["composite"]
+        if prev is not None:
+            comp = prev["composite"]
+            comp[valid] = new[valid]
+            new = comp
+        self.save(key, layer, composite=new, last_date=np.array(today.isoformat()))
+        return new
+
+    def swap_heatmap(self, key: str, heatmap: np.ndarray):
+        """Store heatmap for key and return the previously stored one (or None)."""
+        prev = self.load(key, "heatmap")
+        self.save(key, "heatmap", heatmap=heatmap)
+        return None if prev is None else prev["heatmap"]
@@ -1,6 +1,5 @@
-def pixel_to_latlon_grid(roi, H: int, W: int):
-    """Simple bbox georef over ROI bounds (EPSG:4326)."""
-    minx, miny, maxx, maxy = roi.polygon.bounds  # x=lon, y=lat
+def georef_from_bounds(minx: float, miny: float, maxx: float, maxy: float, H: int, W: int):
+    """Georef of an H x W grid whose corner pixel centres sit on the given lon/lat bounds (EPSG:4326)."""
     def pixel_to_latlon(r, c):
         lat = maxy - (r/(H-1))*(maxy-miny)
         lon = minx + (c/(W-1))*(maxx-minx)
@@ -13,3 +12,8 @@ def pixel_to_latlon_grid(roi, H: int, W: int):
         "lon_min": float(minx), "lon_max": float(maxx),
         "lat_min": float(miny), "lat_max": float(maxy),
     }
+
+def pixel_to_latlon_grid(roi, H: int, W: int):
+    """Simple bbox georef over ROI bounds (EPSG:4326)."""
+    minx, miny, maxx, maxy = roi.polygon.bounds  # x=lon, y=lat
+    return georef_from_bounds(minx, miny, maxx, maxy, H, W)
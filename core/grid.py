@@ -0,0 +1,68 @@
+import math
+import os
+from dataclasses import dataclass
+from .roi import _approx_meters_per_deg
+
+DEFAULT_M_PER_PX = 10.0  # Sentinel-1/2 native GSD
+DEFAULT_MEM_BUDGET_MB = 256
+MIN_GRID_PX = 32
+MAX_REQUEST_PX = 2500  # Process API per-request width/height limit
+BYTES_PER_PX = 80  # fetch + z-score + fusion + DoG float32 working copies
+TILE_WORKERS = int(os.environ.get("ANOMALILAB_TILE_WORKERS", min(4, os.cpu_count() or 1)))
+
+@dataclass
+class GridPlan:
+    H: int
+    W: int
+    m_per_px: float
+    tile_px: int  # 0 -> single pass
+    halo: int
+    workers: int = 1  # tiles filtered at once; the working budget is split between them
+
+    @property
+    def tiled(self) -> bool:
+        return self.tile_px > 0
+
+    def tiles(self):
+        """Yield (core, halo) windows as (r0, r1, c0, c1) tuples."""
+        step = self.tile_px or max(self.H, self.W)
+        for r0 in range(0, self.H, step):
+            for c0 in range(0, self.W, step):
+                r1, c1 = min(self.H, r0 + step), min(self.W, c0 + step)
+                halo = (max(0, r0 - self.halo), min(self.H, r1 + self.halo),
+                        max(0, c0 - self.halo), min(self.W, c1 + self.halo))
+                yield (r0, r1, c0, c1), halo
+
+def roi_extent_m(roi):
+    minx, miny, maxx, maxy = roi.polygon.bounds
+    mlat, mlon = _approx_meters_per_deg((miny + maxy) / 2.0)
+    return (maxx - minx) * mlon, (maxy - miny) * mlat
+
+def plan_grid(roi, target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB) -> GridPlan:
+    """Size the grid from the ROI's metric extent; tile when one pass exceeds the budget."""
+    budget = float(mem_budget_mb) * 1024 * 1024
+    width_m, height_m = roi_extent_m(roi)
+    m_per_px = max(float(target_m_per_px), 1e-3)
+
+    # the output heatmap itself may take at most half the budget
+    max_out_px = budget / 2 / 4
+    if (width_m / m_per_px) * (height_m / m_per_px) > max_out_px:
+        m_per_px = math.sqrt(width_m * height_m / max_out_px)
+
+    W = max(MIN_GRID_PX, int(round(width_m / m_per_px)))
+    H = max(MIN_GRID_PX, int(round(height_m / m_per_px)))
+    eff = max(width_m / W, height_m / H)
+
+    from .analysis import DOG_HALO_PX  # keeps scipy off the app's startup path
+    halo = DOG_HALO_PX
+    if H * W * BYTES_PER_PX <= budget and max(H, W) <= MAX_REQUEST_PX:
+        return GridPlan(H=H, W=W, m_per_px=eff, tile_px=0, halo=halo)
+
+    work_px = max(budget - H * W * 4, budget / 2) / BYTES_PER_PX
+    # parallel tiles only while each keeps a core at least as wide as its halos
+    workers = max(1, TILE_WORKERS)
+    while workers > 1 and int(math.sqrt(work_px / workers)) - 2 * halo < 2 * halo:
+        workers -= 1
+    side = int(math.sqrt(work_px / workers)) - 2 * halo
+    tile_px = max(MIN_GRID_PX, min(side, MAX_REQUEST_PX - 2 * halo))
+    return GridPlan(H=H, W=W, m_per_px=eff, tile_px=tile_px, halo=halo, workers=workers)
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from contextlib import closing
+import numpy as np
+
+QUEUE_DIR = os.environ.get("ANOMALILAB_QUEUE", os.path.join(os.getcwd(), "jobs"))
+DEFAULT_LEASE_S = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_S = 5.0  # times the attempt number
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,            -- queued | leased | done | failed
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    error TEXT,
+    result_path TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (state, not_before, created);
+"""
+
+def roi_to_dict(roi) -> dict:
+    return {"kind": roi.kind, "wkt": roi.polygon.wkt, "center": list(roi.center), "area_m2": roi.area_m2}
+
+def roi_from_dict(d: dict):
+    from shapely import wkt
+    from .roi import ROI
+    return ROI(kind=d["kind"], polygon=wkt.loads(d["wkt"]), center=tuple(d["center"]), area_m2=d["area_m2"])
+
+class JobQueue:
+    """Durable scan queue in one SQLite file, shareable by workers on several hosts.
+
+    A worker leases a job for lease_s and must heartbeat to keep it; an
+    expired lease makes the job available again. Failed attempts are retried
+    with backoff up to max_attempts. Results are written next to the
+    database (results/<id>.npz + .json), so the queue directory is the
+    shared storage. For several hosts, put the directory on a share with
+    working POSIX locks (SQLite locking is unreliable on some NFS setups).
+    """
+
+    def __init__(self, root: str = QUEUE_DIR):
+        self.root = root
+        self.results_dir = os.path.join(root, "results")
+        os.makedirs(self.results_dir, exist_ok=True)
+        self.db_path = os.path.join(root, "queue.sqlite")
+        with closing(self._connect()) as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        return db
+
+    def submit(self, roi, settings: dict, use_real_data: bool = False, max_attempts: int = DEFAULT_MAX_ATTEMPTS, **params) -> str:
+        """Queue a run_scan_pipeline(roi, settings, use_real_data, **params) job; returns its id."""
+        job_id = uuid.uuid4().hex[:12]
+        payload = json.dumps({"roi": roi_to_dict(roi), "settings": settings, "use_real_data": bool(use_real_data), "params": params})
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("INSERT INTO jobs (id, state, payload, max_attempts, created, updated) VALUES (?, 'queued', ?, ?, ?, ?)",
+                       (job_id, payload, int(max_attempts), now, now))
+        return job_id
+
+    def lease(self, worker: str, lease_s: float = DEFAULT_LEASE_S):
+        """Atomically take the oldest runnable job (queued, or leased with an expired lease); None if idle."""
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            # expired leases that used up their attempts are failed rather than retried
+            db.execute("UPDATE jobs SET state='failed', error=COALESCE(error, 'lease expired'), updated=? "
+                       "WHERE state='leased' AND lease_expires < ? AND attempts >= max_attempts", (now, now))
+            row = db.execute("SELECT * FROM jobs WHERE (state='queued' AND not_before <= ?) OR (state='leased' AND lease_expires < ?) "
+                             "ORDER BY created LIMIT 1", (now, now)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute("UPDATE jobs SET state='leased', lease_owner=?, lease_expires=?, attempts=attempts+1, updated=? WHERE id=?",
+                       (worker, now + lease_s, now, row["id"]))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        job = dict(row)
+        job.update(json.loads(job.pop("payload")), attempts=row["attempts"] + 1)
+        return job
+
+    def heartbeat(self, job_id: str, worker: str, lease_s: float = DEFAULT_LEASE_S) -> bool:
+        """Extend the lease; False when the job is no longer leased by this worker."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            cur = db.execute("UPDATE jobs SET lease_expires=?, updated=? WHERE id=? AND state='leased' AND lease_owner=?",
+                             (now + lease_s, now, job_id, worker))
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker: str, result_path: str) -> bool:
+        now = time.time()
+        with closing(self._connect()) as db:
+            cur = db.execute("UPDATE jobs SET state='done', result_path=?, error=NULL, lease_owner=NULL, lease_expires=NULL, updated=? "
+                             "WHERE id=? AND state='leased' AND lease_owner=?", (result_path, now, job_id, worker))
+        return cur.rowcount == 1
+
+    def fail(self, job_id: str, worker: str, error: str) -> str:
+        """Record a failed attempt; requeues with backoff or fails for good. Returns the new state."""
+        now = time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id=? AND state='leased' AND lease_owner=?",
+                             (job_id, worker)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return "lost"
+            state = "queued" if row["attempts"] < row["max_attempts"] else "failed"
+            db.execute("UPDATE jobs SET state=?, error=?, not_before=?, lease_owner=NULL, lease_expires=NULL, updated=? WHERE id=?",
+                       (state, error[:2000], now + RETRY_BACKOFF_S * row["attempts"], now, job_id))
+            db.execute("COMMIT")
+        return state
+
+    def get(self, job_id: str):
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job.update(json.loads(job.pop("payload")))
+        return job
+
+    def list(self, limit: int = 50) -> list:
+        with closing(self._connect()) as db:
+            rows = db.execute("SELECT id, state, attempts, max_attempts, lease_owner, created, updated, error, result_path "
+                              "FROM jobs ORDER BY created DESC LIMIT ?", (int(limit),)).fetchall()
+        return [dict(r) for r in rows]
+
+    def counts(self) -> dict:
+        with closing(self._connect()) as db:
+            return {r["state"]: r["n"] for r in db.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state")}
+
+    def save_result(self, job_id: str, result: dict) -> str:
+        """Write a scan result to results/<id>.npz + .json (atomic renames); returns the .json path."""
+        base = os.path.join(self.results_dir, job_id)
+        g = result["georef"]
+        meta = {
+            "roi": roi_to_dict(result["roi"]),
+            "anomaly_points": result["anomaly_points"],
+            "grid": result["grid"],
+            "bounds": [g["lon_min"], g["lat_min"], g["lon_max"], g["lat_max"]],
+        }
+        tmp = f"{base}.{os.getpid()}.tmp"
+        arrays = {"heatmap": np.asarray(result["heatmap"], dtype=np.float32)}
+        if result.get("change_heatmap") is not None:
+            arrays["change_heatmap"] = np.asarray(result["change_heatmap"], dtype=np.float32)
+        with open(tmp + ".npz", "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp + ".npz", base + ".npz")
+        with open(tmp + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp + ".json", base + ".json")
+        return base + ".json"
+
+    def load_result(self, job_id: str) -> dict:
+        """Rebuild the result dict of a finished job (raster is not kept)."""
+        from .geo import georef_from_bounds
+        base = os.path.join(self.results_dir, job_id)
+        if not os.path.exists(base + ".json"):
+            raise RuntimeError(f"İş sonucu bulunamadı: {job_id}")
+        with open(base + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with np.load(base + ".npz") as z:
+            arrays = {k: z[k] for k in z.files}
+        roi = roi_from_dict(meta["roi"])
+        H, W = arrays["heatmap"].shape
+        return {
+            "roi": roi,
+            "roi_area_m2": roi.area_m2,
+            "heatmap": arrays["heatmap"],
+            "raster": None,
+            "anomaly_points": meta["anomaly_points"],
+            "georef": georef_from_bounds(*meta["bounds"], H, W),
+            "grid": meta["grid"],
+            "change_heatmap": arrays.get("change_heatmap"),
+            "job_id": job_id,
+        }
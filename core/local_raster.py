@@ -0,0 +1,64 @@
+import math
+import numpy as np
+
+def _overview_level(src, decimation: float):
+    """Index of the coarsest overview not coarser than the requested decimation (None -> full res)."""
+    best = None
+    for i, f in enumerate(src.overviews(1)):
+        if f <= decimation:
+            best = i
+    return best
+
+def _snap(v: float, eps: float = 1e-6) -> float:
+    """Round window coordinates that are whole pixels up to float noise, so aligned reads aren't resampled."""
+    r = round(v)
+    return float(r) if abs(v - r) < eps else v
+
+def read_local_window(path: str, bbox_lonlat, shape, resampling: str = "bilinear") -> np.ndarray:
+    """Read band 1 of a local raster over a lon/lat bbox into an (H, W) float32 grid.
+
+    Only the bbox window is read; when the target grid is coarser than the
+    file, the matching overview level is opened instead of the full
+    resolution data. Non-WGS84 rasters are read through a WarpedVRT.
+    Nodata and pixels outside the file are NaN.
+    """
+    import rasterio
+    from rasterio.enums import Resampling
+    from rasterio.vrt import WarpedVRT
+    from rasterio.warp import transform_bounds
+    from rasterio.windows import Window, from_bounds
+
+    H, W = shape
+    rs = Resampling[resampling]
+    out = np.full((H, W), np.nan, dtype=np.float32)
+    min_lon, min_lat, max_lon, max_lat = bbox_lonlat
+
+    with rasterio.open(path) as probe:
+        native = (min_lon, min_lat, max_lon, max_lat)
+        if probe.crs is not None and probe.crs.to_epsg() != 4326:
+            native = transform_bounds("EPSG:4326", probe.crs, *native)
+        win = from_bounds(*native, transform=probe.transform)
+        level = _overview_level(probe, min(win.width / W, win.height / H))
+
+    kw = {} if level is None else {"overview_level": level}
+    with rasterio.open(path, **kw) as src:
+        ds = src if src.crs is None or src.crs.to_epsg() == 4326 else WarpedVRT(src, crs="EPSG:4326", resampling=rs)
+        try:
+            win = from_bounds(min_lon, min_lat, max_lon, max_lat, transform=ds.transform)
+            win = Window(*(_snap(v) for v in (win.col_off, win.row_off, win.width, win.height)))
+            # clip to the dataset and map the clipped part onto the output grid
+            c0, r0 = max(0.0, win.col_off), max(0.0, win.row_off)
+            c1, r1 = min(float(ds.width), win.col_off + win.width), min(float(ds.height), win.row_off + win.height)
+            if c1 <= c0 or r1 <= r0:
+                return out
+            oc0 = int(math.floor((c0 - win.col_off) / win.width * W))
+            oc1 = int(math.ceil((c1 - win.col_off) / win.width * W))
+            or0 = int(math.floor((r0 - win.row_off) / win.height * H))
+            or1 = int(math.ceil((r1 - win.row_off) / win.height * H))
+            sub = Window(c0, r0, c1 - c0, r1 - r0)
+            data = ds.read(1, window=sub, out_shape=(or1 - or0, oc1 - oc0), resampling=rs, masked=True)
+            out[or0:or1, oc0:oc1] = data.astype(np.float32).filled(np.nan)
+        finally:
+            if ds is not src:
+                ds.close()
+    return out
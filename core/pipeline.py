@@ -1,19 +1,99 @@
-from .datasources import get_raster_for_roi
-from .analysis import compute_anomaly_heatmap, pick_anomaly_points
+import math
+import os
+import tempfile
+import numpy as np
+from .datasources import get_raster_for_roi, grid_band_stack, fuse_bands
+from .analysis import scale_space_dog, compute_anomaly_heatmap_chunked, normalize_heatmap, band_sigma, pick_anomaly_points, extract_anomaly_regions
 from .geo import pixel_to_latlon_grid
+from .grid import plan_grid, DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
+from .roi import roi_from_bbox
 
-def run_scan_pipeline(roi, settings: dict, use_real_data: bool = False):
-    size = 256
-    raster = get_raster_for_roi(roi, size=size, settings=settings, use_real_data=use_real_data)
-    heatmap = compute_anomaly_heatmap(raster, settings=settings)
-    georef = pixel_to_latlon_grid(roi, H=size, W=size)
+def _window_bbox(georef, window):
+    """Lon/lat bbox of the (r0, r1, c0, c1) pixel window of a grid.
+
+    Fetches split their bbox into equal pixels edge to edge, so this is the
+    window's own slice of the pixels a fetch of the whole grid would return.
+    """
+    r0, r1, c0, c1 = window
+    dx = (georef["lon_max"] - georef["lon_min"]) / georef["W"]
+    dy = (georef["lat_max"] - georef["lat_min"]) / georef["H"]
+    return (georef["lon_min"] + c0 * dx, georef["lat_max"] - r1 * dy,
+            georef["lon_min"] + c1 * dx, georef["lat_max"] - r0 * dy)
+
+def _window_dog(georef, window, settings: dict, fetch_kw: dict):
+    """Fetch the (r0, r1, c0, c1) pixel window of a grid and return its DoG and scale bands.
+
+    fetch_kw is passed through to get_raster_for_roi (use_real_data, incremental, local_rasters).
+    """
+    r0, r1, c0, c1 = window
+    sub = roi_from_bbox(*_window_bbox(georef, window))
+    raster = get_raster_for_roi(sub, size=(r1 - r0, c1 - c0), settings=settings, **fetch_kw)
+    return scale_space_dog(raster, settings, origin=(r0, c0))
+
+def _tiled_heatmap(plan, georef, settings: dict, fetch_kw: dict):
+    """Two passes: fetch the core tiles into a disk-backed band stack with grid-wide band statistics,
+    then fuse and DoG its halo windows in plan.workers threads into a disk-backed heatmap.
+
+    Every tile is z-scored with the same statistics, so there are no seams;
+    the single-pass renormalization of the fused raster is an affine map,
+    which the DoG and the final min-max normalization cancel.
+    """
+    fd, heat_path = tempfile.mkstemp(prefix="anomalilab-heat-", suffix=".npy")
+    os.close(fd)
+    with tempfile.TemporaryDirectory(prefix="anomalilab-grid-") as tmp:
+        bands, stats = grid_band_stack(plan.H, plan.W, (core for core, _ in plan.tiles()), lambda w: _window_bbox(georef, w),
+                                       settings, tmp, **fetch_kw)
+
+        def read(w):
+            r0, r1, c0, c1 = w
+            return fuse_bands((b[r0:r1, c0:c1] for b in bands), (r1 - r0, c1 - c0), stats=stats)
+
+        heatmap, scale_idx = compute_anomaly_heatmap_chunked(read, heat_path, settings, block=plan.tile_px,
+                                                             workers=plan.workers, shape=(plan.H, plan.W))
+        bands.clear()  # unmap before the directory goes
+    try:
+        os.remove(heat_path)  # the open mapping keeps the data until the heatmap is dropped
+    except OSError:
+        pass  # Windows can't remove a mapped file; it stays in the temp dir
+    return heatmap, scale_idx
+
+def _compute_grid(roi, plan, settings: dict, fetch_kw: dict):
+    georef = pixel_to_latlon_grid(roi, H=plan.H, W=plan.W)
+    if plan.tiled:
+        raster = None
+        heatmap, scale_idx = _tiled_heatmap(plan, georef, settings, fetch_kw)
+    else:
+        raster = get_raster_for_roi(roi, size=(plan.H, plan.W), settings=settings, **fetch_kw)
+        dog, scale_idx = scale_space_dog(raster, settings)
+        heatmap = normalize_heatmap(dog)
+    return raster, heatmap, scale_idx, georef
+
+EXTRACTION_MODES = ("peaks", "components")
+
+def _anomaly_points(heatmap, georef, m_per_px: float, sigma_px_at, extraction: str = "peaks"):
+    """Pick anomalies and attach lat/lon and size estimates; sigma_px_at(r, c) -> sigma in grid px.
+
+    "peaks" keeps the top-k peak picker; "components" returns every
+    significant connected region (median/MAD threshold) sized by its area.
+    """
+    if extraction == "components":
+        found = extract_anomaly_regions(heatmap)
+    elif extraction == "peaks":
+        found = pick_anomaly_points(heatmap)
+    else:
+        raise ValueError(f"Bilinmeyen anomali çıkarım modu: {extraction}")
 
-    pts_px = pick_anomaly_points(heatmap)
     pts_ll = []
-    for p in pts_px:
+    for p in found:
         lat, lon = georef["pixel_to_latlon"](p["row"], p["col"])
         depth_m = round(abs(p["z_rel"])*2.0 + 1.0, 2)
         volume_m3 = round(depth_m * (3.5 + p["score"]*20.0), 2)
+        # blob radius ~ sqrt(2)*sigma (or the region's equal-area radius)
+        sigma_px = float(sigma_px_at(p["row"], p["col"]))
+        if "area_px" in p:
+            radius_m = math.sqrt(p["area_px"] / math.pi) * m_per_px
+        else:
+            radius_m = math.sqrt(2.0) * sigma_px * m_per_px
 
         pts_ll.append({
             "lat": round(lat, 8),
@@ -23,13 +103,44 @@ def run_scan_pipeline(roi, settings: dict, use_real_data: bool = False):
             "z_rel": p["z_rel"],
             "depth_m": depth_m,
             "volume_m3": volume_m3,
+            "sigma_px": round(sigma_px, 3),
+            "radius_m": round(radius_m, 2),
+            "footprint_m2": round(math.pi * radius_m**2, 2),
         })
+        if "area_px" in p:
+            pts_ll[-1]["area_px"] = p["area_px"]
+            clat, clon = georef["pixel_to_latlon"](p["centroid_row"], p["centroid_col"])
+            pts_ll[-1]["centroid_lat"], pts_ll[-1]["centroid_lon"] = round(clat, 8), round(clon, 8)
+    return pts_ll
+
+def _change_heatmap(roi, plan, settings: dict, use_real_data: bool, heatmap):
+    """Signed difference to the previous incremental scan of the same ROI/grid/settings (None on first run)."""
+    from .fetch_store import FetchStore, store_key
+    key = store_key("scan", [round(v, 7) for v in roi.polygon.bounds], plan.H, plan.W, settings, use_real_data)
+    prev = FetchStore().swap_heatmap(key, heatmap)
+    if prev is None or prev.shape != heatmap.shape:
+        return None
+    return (heatmap - prev).astype(np.float32)
 
+def _result(roi, heatmap, raster, points, georef, plan) -> dict:
     return {
         "roi": roi,
         "roi_area_m2": roi.area_m2,
         "heatmap": heatmap,
         "raster": raster,
-        "anomaly_points": pts_ll,
+        "anomaly_points": points,
         "georef": georef,
+        "grid": {"H": plan.H, "W": plan.W, "m_per_px": round(plan.m_per_px, 3), "tiled": plan.tiled, "tile_px": plan.tile_px},
     }
+
+def run_scan_pipeline(roi, settings: dict, use_real_data: bool = False,
+                      target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB,
+                      incremental: bool = False, extraction: str = "peaks", local_rasters: dict | None = None):
+    plan = plan_grid(roi, target_m_per_px=target_m_per_px, mem_budget_mb=mem_budget_mb)
+    fetch_kw = dict(use_real_data=use_real_data, incremental=incremental, local_rasters=local_rasters)
+    raster, heatmap, scale_idx, georef = _compute_grid(roi, plan, settings, fetch_kw)
+    pts_ll = _anomaly_points(heatmap, georef, plan.m_per_px, lambda r, c: band_sigma(scale_idx[r, c]), extraction)
+    result = _result(roi, heatmap, raster, pts_ll, georef, plan)
+    if incremental:
+        result["change_heatmap"] = _change_heatmap(roi, plan, settings, use_real_data, heatmap)
+    return result
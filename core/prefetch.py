@@ -0,0 +1,212 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from .roi import _approx_meters_per_deg
+
+PREFETCH_CACHE_MB = float(os.environ.get("ANOMALILAB_PREFETCH_MB", 512))
+MAX_PREFETCH_PX = 2048  # per side; wider viewports are not prefetched
+DEBOUNCE_S = 0.6  # a viewport must stay put this long before its fetch starts
+IDLE_EXIT_S = 300.0  # a session's worker thread exits after this long without requests
+# share of the daily PU limit that prefetch never spends, kept for real scans
+PREFETCH_PU_RESERVE = float(os.environ.get("ANOMALILAB_PREFETCH_PU_RESERVE", 0.25))
+# settings key -> (fetch layer name, sentinelhub_fetch function, input bands for the PU estimate)
+LAYERS = {"radar": ("s1", "fetch_s1_vv_vh", 2), "optic": ("s2", "fetch_s2_indices", 6), "thermal": ("thermal", "fetch_landsat_thermal", 1)}
+
+def _contains(outer, inner) -> bool:
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+def _px_deg(bbox, size):
+    W, H = size
+    return (bbox[2] - bbox[0]) / W, (bbox[3] - bbox[1]) / H
+
+class PrefetchCache:
+    """Process-wide, byte-bounded LRU of fetched layers (default time interval) by bbox.
+
+    lookup() answers any request whose bbox lies inside a cached bbox at the
+    same or finer resolution, by bilinear resampling of the cached pixels
+    (no-data pixels, all bands zero or non-finite, are masked out first).
+    """
+
+    def __init__(self, max_bytes: float = PREFETCH_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (layer, bbox, size) -> HxWxC float32
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, layer: str, bbox, size, data: np.ndarray):
+        key = (layer, tuple(float(v) for v in bbox), tuple(size))
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            self._entries[key] = data
+            self._bytes += data.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._bytes -= self._entries.popitem(last=False)[1].nbytes
+
+    def _find(self, layer: str, bbox, size):
+        want = _px_deg(bbox, size)
+        with self._lock:
+            for key in reversed(self._entries):
+                l, cb, cs = key
+                have = _px_deg(cb, cs)
+                if l == layer and _contains(cb, bbox) and have[0] <= want[0] * 1.01 and have[1] <= want[1] * 1.01:
+                    self._entries.move_to_end(key)
+                    return cb, self._entries[key]
+        return None
+
+    def covers(self, layer: str, bbox, size) -> bool:
+        return self._find(layer, bbox, size) is not None
+
+    def lookup(self, layer: str, bbox, size):
+        """(H, W, C) float32 for bbox at size=(W, H) from a covering entry, or None."""
+        from .telemetry import metrics
+        hit = self._find(layer, bbox, size)
+        metrics.inc("anomalilab_prefetch_lookups_total", layer=layer, result="hit" if hit else "miss")
+        if hit is None:
+            return None
+        from scipy.ndimage import map_coordinates
+        cb, data = hit
+        W, H = size
+        cdx, cdy = _px_deg(cb, (data.shape[1], data.shape[0]))
+        dx, dy = _px_deg(bbox, size)
+        # pixel centres of the request, in the cached grid's pixel coordinates
+        rows = (cb[3] - (bbox[3] - (np.arange(H) + 0.5) * dy)) / cdy - 0.5
+        cols = (bbox[0] + (np.arange(W) + 0.5) * dx - cb[0]) / cdx - 0.5
+        rr, cc = np.meshgrid(rows, cols, indexing="ij")
+        # normalised interpolation: no-data neighbours get zero weight instead of pulling values to 0;
+        # output pixels that are mostly no-data stay no-data
+        valid = np.isfinite(data).all(axis=2) & (data != 0).any(axis=2)
+        w = map_coordinates(valid.astype(np.float32), [rr, cc], order=1, mode="nearest")
+        keep = w >= 0.5
+        out = np.zeros((H, W, data.shape[2]), dtype=np.float32)
+        for ch in range(data.shape[2]):
+            v = map_coordinates(np.where(valid, data[..., ch], 0).astype(np.float32), [rr, cc], order=1, mode="nearest")
+            out[..., ch][keep] = v[keep] / w[keep]
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "mb": round(self._bytes / 1e6, 1)}
+
+class Prefetcher:
+    """A session's background worker that fetches its latest requested viewport into the shared PrefetchCache.
+
+    Requests coalesce: only the most recent viewport is kept, it must stay
+    put for DEBOUNCE_S, and a newer request or cancel() stops the remaining
+    layers of the current one (an in-flight HTTP call is allowed to finish).
+    Keep one per session so users don't cancel each other's viewports; the
+    thread exits after IDLE_EXIT_S without requests and restarts on demand.
+    Layers are skipped once their estimate would dip into the last
+    PREFETCH_PU_RESERVE of the daily PU limit.
+    """
+
+    def __init__(self, cache: PrefetchCache):
+        self.cache = cache
+        self._cond = threading.Condition()
+        self._target = None  # (bbox, size, [(layer, fn name)])
+        self._gen = 0
+        self._thread = None
+        self._state = {"pending": False, "running": None, "fetched": 0, "cancelled": 0, "errors": 0, "budget_skips": 0}
+
+    @property
+    def state(self) -> dict:
+        """Snapshot of the worker's counters, safe to read from the Streamlit thread."""
+        with self._cond:
+            return dict(self._state)
+
+    def _set(self, key: str, value):
+        with self._cond:
+            self._state[key] = value
+
+    def _bump(self, key: str):
+        with self._cond:
+            self._state[key] += 1
+
+    def request(self, bbox, settings: dict, m_per_px: float) -> bool:
+        """Queue bbox for the enabled layers at ~m_per_px; False when too large or already cached."""
+        minx, miny, maxx, maxy = bbox
+        mlat, mlon = _approx_meters_per_deg((miny + maxy) / 2.0)
+        W = max(1, round((maxx - minx) * mlon / m_per_px))
+        H = max(1, round((maxy - miny) * mlat / m_per_px))
+        if max(W, H) > MAX_PREFETCH_PX:
+            return False
+        jobs = [LAYERS[k] for k in LAYERS if settings.get(k) and not self.cache.covers(LAYERS[k][0], bbox, (W, H))]
+        if not jobs:
+            return False
+        with self._cond:
+            target = (tuple(bbox), (W, H), jobs)
+            if target[:2] == (self._target or (None, None))[:2]:
+                return True
+            self._target = target
+            self._gen += 1
+            self._state["pending"] = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return True
+
+    def cancel(self):
+        with self._cond:
+            self._target = None
+            self._gen += 1
+            self._state["pending"] = False
+
+    def _run(self):
+        from . import sentinelhub_fetch
+        from .telemetry import PUBudgetExceeded, estimate_pu, pu_budget
+        while True:
+            with self._cond:
+                if self._target is None:
+                    self._cond.wait(IDLE_EXIT_S)
+                if self._target is None:
+                    self._thread = None  # request() starts a new one
+                    return
+                gen = self._gen
+            time.sleep(DEBOUNCE_S)
+            with self._cond:
+                if gen != self._gen or self._target is None:
+                    continue  # panned again (or cancelled) while debouncing
+                bbox, size, jobs = self._target
+                self._target = None
+                self._state["pending"] = False
+            budget = pu_budget()
+            float32 = sentinelhub_fetch._transfer() != "uint16"
+            for layer, fn_name, bands in jobs:
+                if gen != self._gen:
+                    self._bump("cancelled")
+                    break
+                if self.cache.covers(layer, bbox, size):
+                    continue
+                if budget.daily_limit and budget.remaining() - estimate_pu(size, bands, float32) < PREFETCH_PU_RESERVE * budget.daily_limit:
+                    self._bump("budget_skips")
+                    break
+                self._set("running", layer)
+                try:
+                    data = getattr(sentinelhub_fetch, fn_name)(bbox, size=size)
+                    if data.any():  # thermal failures come back as zeros; don't serve those later
+                        self.cache.put(layer, bbox, size, data)
+                    self._bump("fetched")
+                except PUBudgetExceeded:
+                    break
+                except Exception:
+                    self._bump("errors")
+                finally:
+                    self._set("running", None)
+
+_cache = None
+_lock = threading.Lock()
+
+def prefetch_cache() -> PrefetchCache:
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = PrefetchCache()
+        return _cache
+
+def pad_bbox(bbox, frac: float = 0.1):
+    minx, miny, maxx, maxy = bbox
+    px, py = (maxx - minx) * frac, (maxy - miny) * frac
+    return (minx - px, miny - py, maxx + px, maxy + py)
@@ -0,0 +1,115 @@
+import math
+import tempfile
+import numpy as np
+from scipy.ndimage import zoom
+from .analysis import band_sigma, normalize_heatmap, scale_space_dog, DOG_HALO_PX
+from .datasources import grid_band_stack, fuse_bands
+from .geo import pixel_to_latlon_grid
+from .grid import plan_grid, roi_extent_m, DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
+from .pipeline import _compute_grid, _window_bbox, _window_dog, _anomaly_points, _result
+
+PREVIEW_PX = 64
+MAX_REFINE_REGIONS = 8
+MIN_REGION_HALF_PX = 32
+
+def _upsample(a: np.ndarray, H: int, W: int, order: int) -> np.ndarray:
+    if a.shape == (H, W):
+        return a.copy()
+    return zoom(a, (H / a.shape[0], W / a.shape[1]), order=order, output=a.dtype)
+
+def _block_mean(a: np.ndarray, h: int, w: int) -> np.ndarray:
+    """(h, w) area means of a larger 2D array (e.g. a memmap), read one output row at a time."""
+    H, W = a.shape
+    re = np.round(np.linspace(0, H, h + 1)).astype(int)
+    ce = np.round(np.linspace(0, W, w + 1)).astype(int)
+    out = np.empty((h, w), dtype=np.float32)
+    for i in range(h):
+        cols = np.asarray(a[re[i]:re[i + 1]], dtype=np.float64).sum(axis=0)
+        out[i] = np.add.reduceat(cols, ce[:-1]) / ((re[i + 1] - re[i]) * np.diff(ce))
+    return out
+
+def run_progressive_scan(roi, settings: dict, use_real_data: bool = False,
+                         target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB,
+                         preview_px: int = PREVIEW_PX, max_regions: int = MAX_REFINE_REGIONS,
+                         extraction: str = "peaks", local_rasters: dict | None = None):
+    """Coarse-to-fine scan; yields a result dict per stage ("preview", "refine", "final").
+
+    The preview is a full scan at ~preview_px on the ROI's long side.
+    Refinement then fetches and analyses full-resolution windows only
+    around the strongest preview anomalies and pastes them, matched to the
+    preview's local mean/std, into the upsampled preview heatmap. Demo data
+    is drawn once at full resolution, as a normal scan of the ROI would,
+    and both stages read that field.
+    """
+    with tempfile.TemporaryDirectory(prefix="anomalilab-progressive-") as tmp:
+        yield from _progressive(roi, settings, use_real_data, target_m_per_px, mem_budget_mb, preview_px, max_regions,
+                                extraction, local_rasters, tmp)
+
+def _progressive(roi, settings, use_real_data, target_m_per_px, mem_budget_mb, preview_px, max_regions,
+                 extraction, local_rasters, tmp):
+    width_m, height_m = roi_extent_m(roi)
+    coarse_m = max(float(target_m_per_px), max(width_m, height_m) / preview_px)
+    cplan = plan_grid(roi, target_m_per_px=coarse_m, mem_budget_mb=mem_budget_mb)
+    plan = plan_grid(roi, target_m_per_px=target_m_per_px, mem_budget_mb=mem_budget_mb)
+    georef = pixel_to_latlon_grid(roi, H=plan.H, W=plan.W)
+    fetch_kw = dict(use_real_data=use_real_data, local_rasters=local_rasters)
+    if use_real_data or local_rasters:
+        _, cheat, cidx, cgeo = _compute_grid(roi, cplan, settings, fetch_kw)
+        window_dog = lambda h: _window_dog(georef, h, settings, fetch_kw)
+    else:
+        (field,), stats = grid_band_stack(plan.H, plan.W, (core for core, _ in plan.tiles()), lambda w: _window_bbox(georef, w),
+                                          settings, tmp)
+        cgeo = pixel_to_latlon_grid(roi, H=cplan.H, W=cplan.W)
+        dog, cidx = scale_space_dog(_block_mean(field, cplan.H, cplan.W), settings)
+        cheat = normalize_heatmap(dog)
+
+        def window_dog(h):
+            raster = fuse_bands([field[h[0]:h[1], h[2]:h[3]]], (h[1] - h[0], h[3] - h[2]), stats=stats)
+            return scale_space_dog(raster, settings, origin=(h[0], h[2]))
+
+    cpts = _anomaly_points(cheat, cgeo, cplan.m_per_px, lambda r, c: band_sigma(cidx[r, c]), extraction)
+    res = _result(roi, cheat, None, cpts, cgeo, cplan)
+    res.update(stage="preview", progress=0.0)
+    yield res
+
+    if (plan.H, plan.W) == (cplan.H, cplan.W):
+        res["stage"], res["progress"] = "final", 1.0
+        yield res
+        return
+
+    heat = _upsample(cheat, plan.H, plan.W, order=1)
+    ratio = cplan.m_per_px / plan.m_per_px
+    sy, sx = (cplan.H - 1) / max(plan.H - 1, 1), (cplan.W - 1) / max(plan.W - 1, 1)
+    refined = []  # (r0, r1, c0, c1, scale_idx)
+
+    def sigma_px_at(r, c):
+        for r0, r1, c0, c1, idx in reversed(refined):
+            if r0 <= r < r1 and c0 <= c < c1:
+                return band_sigma(idx[r - r0, c - c0])
+        return band_sigma(cidx[int(round(r * sy)), int(round(c * sx))]) * ratio
+
+    # candidates come from the preview's own peak picker, strongest first
+    cands = sorted(cpts, key=lambda p: p["score"], reverse=True)[:max_regions]
+    for i, p in enumerate(cands, 1):
+        r = int(round((cgeo["lat_max"] - p["lat"]) / (cgeo["lat_max"] - cgeo["lat_min"]) * (plan.H - 1)))
+        c = int(round((p["lon"] - cgeo["lon_min"]) / (cgeo["lon_max"] - cgeo["lon_min"]) * (plan.W - 1)))
+        half = max(MIN_REGION_HALF_PX, int(math.ceil(3 * p["sigma_px"] * ratio)))
+        r0, r1 = max(0, r - half), min(plan.H, r + half + 1)
+        c0, c1 = max(0, c - half), min(plan.W, c + half + 1)
+        h = (max(0, r0 - DOG_HALO_PX), min(plan.H, r1 + DOG_HALO_PX), max(0, c0 - DOG_HALO_PX), min(plan.W, c1 + DOG_HALO_PX))
+        dog, idx = window_dog(h)
+        core = (slice(r0 - h[0], r1 - h[0]), slice(c0 - h[2], c1 - h[2]))
+        fine, base = dog[core], heat[r0:r1, c0:c1]
+        heat[r0:r1, c0:c1] = np.clip((fine - fine.mean()) / (fine.std() + 1e-6) * base.std() + base.mean(), 0.0, 1.0)
+        refined.append((r0, r1, c0, c1, idx[core].copy()))
+
+        pts = _anomaly_points(heat, georef, plan.m_per_px, sigma_px_at, extraction)
+        res = _result(roi, heat, None, pts, georef, plan)
+        last = i == len(cands)
+        res.update(stage="final" if last else "refine", progress=i / len(cands))
+        yield res
+
+    if not cands:
+        res = _result(roi, heat, None, [], georef, plan)
+        res.update(stage="final", progress=1.0)
+        yield res
@@ -1,9 +1,10 @@
 import numpy as np
 import datetime as dt
+from .compact import grid_of
 
 def build_report(result: dict, settings: dict, use_real_data: bool) -> dict:
     pts = result.get("anomaly_points", [])
-    heat = result["heatmap"]
+    heat = grid_of(result)
 
     layer_count = sum(1 for k,v in settings.items() if v)
     contrast = float(np.std(heat))
@@ -25,6 +26,7 @@ def build_report(result: dict, settings: dict, use_real_data: bool) -> dict:
     methods = [
         "ROI üzerinden çoklu katman çekimi",
         "Normalize + DoG (Difference of Gaussians) anomali haritası",
+        "Ölçek-uzayı DoG ile anomali ölçeği/ayak izi tahmini",
         "Tepe noktası seçimi (min mesafe kısıtı)",
         "Kümeye dayalı özet (demo)",
     ]
@@ -38,6 +40,8 @@ def build_report(result: dict, settings: dict, use_real_data: bool) -> dict:
     else:
         data_type = "Demo (sentetik raster)"
         sources = ["Demo raster"]
+    if settings.get("magnetic"):
+        sources.append("Yerel manyetometre grid'i (GeoTIFF)")
 
     return {
         "timestamp": now,
@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 from typing import Tuple
-from shapely.geometry import Polygon
+from shapely.geometry import Polygon, box
 import math
 
 @dataclass
 class ROI:
-    kind: str  # polygon | circle
+    kind: str  # polygon | circle | bbox
     polygon: Polygon  # lon/lat coords
     center: Tuple[float, float]  # (lat, lon)
     area_m2: float
@@ -27,6 +27,10 @@ def _polygon_area_m2(poly: Polygon) -> float:
         area += x1*y2 - x2*y1
     return abs(area) * 0.5
 
+def roi_from_bbox(minx: float, miny: float, maxx: float, maxy: float) -> ROI:
+    poly = box(minx, miny, maxx, maxy)
+    return ROI(kind="bbox", polygon=poly, center=(poly.centroid.y, poly.centroid.x), area_m2=_polygon_area_m2(poly))
+
 def roi_from_drawn_feature(feature: dict) -> ROI:
     geom = feature.get("geometry", {})
     props = feature.get("properties", {}) or {}
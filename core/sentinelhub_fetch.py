@@ -1,14 +1,31 @@
 from __future__ import annotations
+import io
+import os
+import time
+import threading
+import zlib
+import logging
 from dataclasses import dataclass
 from typing import Tuple
 import numpy as np
 
-def _get_secrets():
+DEFAULT_TIME_INTERVAL = ("2024-01-01", "2026-12-31")
+
+log = logging.getLogger(__name__)
+
+def _secret(name: str):
+    """Streamlit secret, falling back to the environment (CLI, workers, load tests)."""
     try:
         import streamlit as st
-        return st.secrets.get("SH_CLIENT_ID", None), st.secrets.get("SH_CLIENT_SECRET", None)
+        val = st.secrets.get(name, None)
+        if val:
+            return val
     except Exception:
-        return None, None
+        pass
+    return os.environ.get(name) or None
+
+def _get_secrets():
+    return _secret("SH_CLIENT_ID"), _secret("SH_CLIENT_SECRET")
 
 def have_credentials() -> bool:
     cid, csec = _get_secrets()
@@ -22,11 +39,113 @@ def _make_shconfig():
     cfg = SHConfig()
     cfg.sh_client_id = cid
     cfg.sh_client_secret = csec
+    # optional endpoint overrides, e.g. a local Process API stub (bench/sh_stub.py)
+    if _secret("SH_BASE_URL"):
+        cfg.sh_base_url = _secret("SH_BASE_URL")
+    if _secret("SH_TOKEN_URL"):
+        cfg.sh_token_url = _secret("SH_TOKEN_URL")
     return cfg
 
-def _request(collection, evalscript: str, bbox_lonlat: Tuple[float,float,float,float], size: Tuple[int,int], time_interval: Tuple[str,str]):
+def _header(headers: dict, name: str):
+    name = name.lower()
+    return next((v for k, v in headers.items() if k.lower() == name), None)
+
+@dataclass(frozen=True)
+class _Codec:
+    """UINT16 transfer encoding of a float band; DN 0 is reserved for exact zeros / no-data."""
+    kind: str  # "linear" | "db" | "dn" (already integer DNs, passed through)
+    lo: float = 0.0
+    hi: float = 1.0
+
+    @property
+    def step(self) -> float:
+        return (self.hi - self.lo) / 65534.0
+
+    def js(self) -> str:
+        if self.kind == "dn":
+            return "function enc(v) { return v; }"
+        # dB has no value at or below zero (and NaN would reach the UINT16 output): those go out as no-data
+        val, nodata = ("10 * Math.log(v) / Math.LN10", "!(v > 0)") if self.kind == "db" else ("v", "!(v > 0 || v < 0)")
+        return (f"function enc(v) {{ if ({nodata}) return 0; var x = {val};"
+                f" return Math.max(1, Math.min(65535, Math.round((x - {self.lo}) / {self.step!r}) + 1)); }}")
+
+    def decode(self, dn: np.ndarray, out: np.ndarray) -> np.ndarray:
+        if self.kind == "dn":
+            np.copyto(out, dn, casting="unsafe")
+            return out
+        np.subtract(dn, 1, out=out, casting="unsafe")
+        out *= np.float32(self.step)
+        out += np.float32(self.lo)
+        if self.kind == "db":
+            out *= np.float32(np.log(10) / 10)
+            np.exp(out, out=out)
+        out[dn == 0] = 0.0
+        return out
+
+def _transfer() -> str:
+    """Process API sample type: "uint16" (default; half the bytes and PU) or "float32"."""
+    return "float32" if (_secret("SH_TRANSFER") or "uint16").lower() == "float32" else "uint16"
+
+def _evalscript(inputs: str, nbands: int, body: str, codec: _Codec | None) -> str:
+    """Evalscript returning body's values as FLOAT32, or UINT16-encoded through codec."""
+    if codec is None:
+        return f"""//VERSION=3
+function setup() {{ return {{input: [{inputs}], output: {{bands: {nbands}, sampleType: "FLOAT32"}}}}; }}
+function raw(s) {{ {body} }}
+function evaluatePixel(s) {{ return raw(s); }}
+"""
+    return f"""//VERSION=3
+function setup() {{ return {{input: [{inputs}], output: {{bands: {nbands}, sampleType: "UINT16"}}}}; }}
+function raw(s) {{ {body} }}
+{codec.js()}
+function evaluatePixel(s) {{ return raw(s).map(enc); }}
+"""
+
+_buffers = threading.local()
+
+def _staging(shape, dtype) -> np.ndarray:
+    """Per-thread reusable decode buffer (UINT16 DNs are rescaled out of it)."""
+    key = (tuple(shape), np.dtype(dtype).str)
+    pool = _buffers.__dict__.setdefault("pool", {})
+    buf = pool.get(key)
+    if buf is None:
+        pool.clear()  # keep one buffer per thread; scans reuse one size per layer
+        buf = pool[key] = np.empty(shape, dtype=dtype)
+    return buf
+
+def decode_tiff(content: bytes, codec: _Codec | None = None) -> np.ndarray:
+    """Decode a Process API TIFF into a new HxWxC float32 array with no intermediate copies.
+
+    FLOAT32 payloads are decoded straight into the result; UINT16 payloads
+    go through a reusable per-thread buffer and are rescaled into it.
+    """
+    import tifffile
+    with tifffile.TiffFile(io.BytesIO(content)) as tif:
+        series = tif.series[0]
+        shape, dtype = tuple(series.shape), series.dtype
+        out = np.empty(shape, dtype=np.float32)
+        if dtype == np.float32:
+            tif.asarray(out=out)
+        else:
+            raw = _staging(shape, dtype)
+            tif.asarray(out=raw)
+            if codec is None:
+                np.copyto(out, raw, casting="unsafe")
+            else:
+                codec.decode(raw, out)
+    return out[..., None] if out.ndim == 2 else out  # HxWxC, also for single-band outputs
+
+def _request(collection, evalscript: str, bbox_lonlat: Tuple[float,float,float,float], size: Tuple[int,int], time_interval: Tuple[str,str],
+             layer: str = "other", input_bands: int = 3, codec: _Codec | None = None):
+    """One Process API call; reserves its PU estimate from the daily budget first and records latency, bytes and PU spent."""
     from sentinelhub import SentinelHubRequest, BBox, CRS, MimeType
+    from .telemetry import metrics, pu_budget, estimate_pu, PUBudgetExceeded
+    budget = pu_budget()
+    estimate = estimate_pu(size, input_bands, float32=codec is None)
     cfg = _make_shconfig()
+    if _secret("SH_BASE_URL") and collection.service_url != cfg.sh_base_url:
+        # collections carry their own service URL; route them to the override too
+        collection = collection.define_from(f"{collection.name}_AT_{zlib.crc32(cfg.sh_base_url.encode())}", service_url=cfg.sh_base_url)
     min_lon, min_lat, max_lon, max_lat = bbox_lonlat
     bbox = BBox(bbox=[min_lon, min_lat, max_lon, max_lat], crs=CRS.WGS84)
 
@@ -39,28 +158,45 @@ def _request(collection, evalscript: str, bbox_lonlat: Tuple[float,float,float,f
         size=size,
         config=cfg,
     )
-    return req.get_data()[0].astype(np.float32)  # HxWxC
+    try:
+        reservation = budget.reserve(estimate)
+    except PUBudgetExceeded:
+        metrics.inc("anomalilab_sh_requests_total", layer=layer, status="budget")
+        raise
+    t0 = time.perf_counter()
+    try:
+        resp = req.get_data(decode_data=False)[0]
+    except BaseException:
+        budget.settle(reservation, 0.0)
+        metrics.inc("anomalilab_sh_requests_total", layer=layer, status="error")
+        metrics.observe("anomalilab_sh_request_seconds", time.perf_counter() - t0, layer=layer)
+        raise
+    metrics.observe("anomalilab_sh_request_seconds", time.perf_counter() - t0, layer=layer)
+    metrics.observe("anomalilab_sh_response_bytes", len(resp.content), layer=layer)
+    metrics.inc("anomalilab_sh_response_bytes_total", len(resp.content), layer=layer)
+    metrics.inc("anomalilab_sh_requests_total", layer=layer, status="ok")
+    pu = _header(resp.headers, "x-processingunits-spent")
+    pu = float(pu) if pu is not None else estimate
+    metrics.inc("anomalilab_sh_processing_units_total", pu, layer=layer)
+    budget.settle(reservation, pu)
 
-def fetch_s1_vv_vh(bbox_lonlat, size=(256,256), time_interval=("2024-01-01","2026-12-31")) -> np.ndarray:
+    return decode_tiff(resp.content, codec)
+
+# per-layer UINT16 codecs: backscatter in dB, indices/reflectance linear, Landsat DNs as is
+S1_CODEC = _Codec("db", -60.0, 20.0)
+S2_CODEC = _Codec("linear", -1.0, 2.0)
+THERMAL_CODEC = _Codec("dn")
+
+def fetch_s1_vv_vh(bbox_lonlat, size=(256,256), time_interval=DEFAULT_TIME_INTERVAL) -> np.ndarray:
     from sentinelhub import DataCollection
-    evalscript = """//VERSION=3
-function setup() {
-  return {input: [{bands: ["VV", "VH"], units: "LINEAR"}], output: {bands: 2, sampleType: "FLOAT32"}};
-}
-function evaluatePixel(s) { return [s.VV, s.VH]; }
-"""
-    return _request(DataCollection.SENTINEL1_IW, evalscript, bbox_lonlat, size, time_interval)
+    codec = S1_CODEC if _transfer() == "uint16" else None
+    evalscript = _evalscript('{bands: ["VV", "VH"], units: "LINEAR"}', 2, "return [s.VV, s.VH];", codec)
+    return _request(DataCollection.SENTINEL1_IW, evalscript, bbox_lonlat, size, time_interval, layer="s1", input_bands=2, codec=codec)
 
-def fetch_s2_indices(bbox_lonlat, size=(256,256), time_interval=("2024-01-01","2026-12-31")) -> np.ndarray:
+def fetch_s2_indices(bbox_lonlat, size=(256,256), time_interval=DEFAULT_TIME_INTERVAL) -> np.ndarray:
     from sentinelhub import DataCollection
-    evalscript = """//VERSION=3
-function setup() {
-  return {
-    input: [{bands: ["B02","B03","B04","B08","B11","SCL"], units: "REFLECTANCE"}],
-    output: {bands: 4, sampleType: "FLOAT32"}
-  };
-}
-function evaluatePixel(s) {
+    codec = S2_CODEC if _transfer() == "uint16" else None
+    evalscript = _evalscript('{bands: ["B02","B03","B04","B08","B11","SCL"], units: "REFLECTANCE"}', 4, """
   var scl = s.SCL;
   var invalid = (scl==3 || scl==8 || scl==9 || scl==10 || scl==11);
   if (invalid) { return [0,0,0,0]; }
@@ -69,19 +205,20 @@ function evaluatePixel(s) {
   var ndbi = (s.B11 - s.B08) / (s.B11 + s.B08 + 1e-6);
   var bright = (s.B02 + s.B03 + s.B04) / 3.0;
   return [ndvi, ndwi, ndbi, bright];
-}
-"""
-    return _request(DataCollection.SENTINEL2_L2A, evalscript, bbox_lonlat, size, time_interval)
+""", codec)
+    return _request(DataCollection.SENTINEL2_L2A, evalscript, bbox_lonlat, size, time_interval, layer="s2", input_bands=6, codec=codec)
 
-def fetch_landsat_thermal(bbox_lonlat, size=(256,256), time_interval=("2024-01-01","2026-12-31")) -> np.ndarray:
+def fetch_landsat_thermal(bbox_lonlat, size=(256,256), time_interval=DEFAULT_TIME_INTERVAL) -> np.ndarray:
     from sentinelhub import DataCollection
-    evalscript = """//VERSION=3
-function setup() {
-  return {input: [{bands: ["ST_B10"], units: "DN"}], output: {bands: 1, sampleType: "FLOAT32"}};
-}
-function evaluatePixel(s) { return [s.ST_B10]; }
-"""
+    from .telemetry import metrics, PUBudgetExceeded
+    codec = THERMAL_CODEC if _transfer() == "uint16" else None
+    evalscript = _evalscript('{bands: ["ST_B10"], units: "DN"}', 1, "return [s.ST_B10];", codec)
     try:
-        return _request(DataCollection.LANDSAT_OT_L2, evalscript, bbox_lonlat, size, time_interval)
-    except Exception:
+        return _request(DataCollection.LANDSAT_OT_L2, evalscript, bbox_lonlat, size, time_interval, layer="thermal", input_bands=1, codec=codec)
+    except PUBudgetExceeded:
+        raise
+    except Exception as e:
+        # thermal coverage is patchy; keep the scan going on a zero layer but make it visible
+        metrics.inc("anomalilab_sh_layer_fallbacks_total", layer="thermal", reason=type(e).__name__)
+        log.warning("Landsat thermal fetch failed for %s, using a zero layer: %s", bbox_lonlat, e)
         return np.zeros((size[1], size[0], 1), dtype=np.float32)
@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import Future
+import numpy as np
+from .fetch_store import store_key
+
+class SingleFlight:
+    """Process-wide coalescing: concurrent calls with the same key share one computation.
+
+    Only in-flight work is shared; once the leader finishes, the key is
+    released and the next call computes afresh.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def do(self, key: str, fn, *args, **kwargs):
+        """Return (value, shared); shared is True when this call waited on another caller's run."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            return fut.result(), True
+        try:
+            fut.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return fut.result(), False
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+_scans = SingleFlight()
+
+def _freeze(obj):
+    """Mark every array in a (nested) result read-only so sessions can share it."""
+    if isinstance(obj, np.ndarray):
+        obj.flags.writeable = False
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _freeze(v)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            _freeze(v)
+    return obj
+
+def scan_key(roi, settings: dict, use_real_data: bool, **params) -> str:
+    return store_key(roi.polygon.wkt, settings, bool(use_real_data), params)
+
+def run_scan_shared(roi, settings: dict, use_real_data: bool = False, **params):
+    """run_scan_pipeline coalesced across sessions on (ROI geometry, settings, data mode, grid params).
+
+    The returned result is shared and read-only; copy arrays before mutating them.
+    """
+    from .pipeline import run_scan_pipeline
+
+    def _run():
+        return _freeze(run_scan_pipeline(roi, settings=settings, use_real_data=use_real_data, **params))
+
+    result, _ = _scans.do(scan_key(roi, settings, use_real_data, **params), _run)
+    return result
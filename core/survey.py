@@ -0,0 +1,97 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from shapely.geometry import box
+from .roi import roi_from_bbox, _approx_meters_per_deg
+from .grid import roi_extent_m, DEFAULT_M_PER_PX, DEFAULT_MEM_BUDGET_MB
+
+DEFAULT_CELL_M = 1000.0
+COARSE_PX = 256  # long side of the single coarse scoring grid
+MAD_TO_SIGMA = 1.4826
+
+def fishnet(roi, cell_m: float = DEFAULT_CELL_M) -> list:
+    """Square cells of ~cell_m covering the ROI bbox; only cells touching the ROI polygon are kept."""
+    minx, miny, maxx, maxy = roi.polygon.bounds
+    mlat, mlon = _approx_meters_per_deg((miny + maxy) / 2.0)
+    dlon, dlat = cell_m / mlon, cell_m / mlat
+    nx, ny = max(1, math.ceil((maxx - minx) / dlon)), max(1, math.ceil((maxy - miny) / dlat))
+    cells = []
+    for j in range(ny):
+        for i in range(nx):
+            x0, y1 = minx + i * dlon, maxy - j * dlat
+            b = (x0, max(miny, y1 - dlat), min(maxx, x0 + dlon), y1)
+            if roi.polygon.intersects(box(*b)):
+                cells.append({"id": (j, i), "bounds": b, "roi": roi_from_bbox(*b)})
+    return cells
+
+def plan_survey(roi, settings: dict, use_real_data: bool = False, cell_m: float = DEFAULT_CELL_M,
+                coarse_px: int = COARSE_PX, local_rasters: dict | None = None) -> dict:
+    """Fishnet the ROI and score every cell from one coarse fetch of the whole area.
+
+    The score is the 99th percentile, inside the cell, of the coarse DoG's
+    robust z (|dog - median| / MAD over the whole area), so cells are
+    comparable with each other. Cells come back sorted by score, highest first.
+    """
+    from .datasources import get_raster_for_roi
+    from .analysis import scale_space_dog
+
+    width_m, height_m = roi_extent_m(roi)
+    m_per_px = max(width_m, height_m) / coarse_px
+    H, W = max(8, round(height_m / m_per_px)), max(8, round(width_m / m_per_px))
+    raster = get_raster_for_roi(roi, size=(H, W), settings=settings, use_real_data=use_real_data, local_rasters=local_rasters)
+    dog, _ = scale_space_dog(raster, settings)
+    med = float(np.median(dog))
+    z = np.abs(dog - med) / (MAD_TO_SIGMA * float(np.median(np.abs(dog - med))) + 1e-9)
+
+    minx, miny, maxx, maxy = roi.polygon.bounds
+    cells = fishnet(roi, cell_m)
+    for cell in cells:
+        x0, y0, x1, y1 = cell["bounds"]
+        r0 = min(H - 1, int((maxy - y1) / (maxy - miny) * H))
+        c0 = min(W - 1, int((x0 - minx) / (maxx - minx) * W))
+        r1 = max(r0 + 1, math.ceil((maxy - y0) / (maxy - miny) * H))
+        c1 = max(c0 + 1, math.ceil((x1 - minx) / (maxx - minx) * W))
+        cell["score"] = round(float(np.percentile(z[r0:r1, c0:c1], 99)), 3)
+    cells.sort(key=lambda c: c["score"], reverse=True)
+    for rank, cell in enumerate(cells, 1):
+        cell["rank"] = rank
+    return {"cells": cells, "coarse_z": z.astype(np.float32), "coarse_m_per_px": round(m_per_px, 1)}
+
+def run_survey(cells: list, settings: dict, use_real_data: bool = False, workers: int = 2,
+               budget_s: float | None = None, max_cells: int | None = None, min_score: float = 0.0,
+               target_m_per_px: float = DEFAULT_M_PER_PX, mem_budget_mb: float = DEFAULT_MEM_BUDGET_MB, **scan_kw):
+    """Full scans of the cells in priority (list) order on a worker pool; yields one dict per finished cell.
+
+    A cell is only started while the compute budget allows: fewer than
+    max_cells started, less than budget_s elapsed and score >= min_score.
+    Cells that were never started are simply not yielded.
+    Each yield: {"cell", "result", "done", "started", "queued"}.
+    """
+    from .pipeline import run_scan_pipeline
+
+    queue = [c for c in cells if c["score"] >= min_score][:max_cells]
+    t0, started, done = time.perf_counter(), 0, 0
+
+    def _scan(cell):
+        return run_scan_pipeline(cell["roi"], settings=settings, use_real_data=use_real_data,
+                                 target_m_per_px=target_m_per_px, mem_budget_mb=mem_budget_mb, **scan_kw)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running = {}
+        while queue or running:
+            # top up the pool with the highest-priority cells while budget remains
+            while queue and len(running) < max(1, workers):
+                if budget_s is not None and time.perf_counter() - t0 >= budget_s:
+                    queue = []
+                    break
+                cell = queue.pop(0)
+                running[pool.submit(_scan, cell)] = cell
+                started += 1
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in sorted(finished, key=lambda f: running[f]["rank"]):
+                cell = running.pop(fut)
+                done += 1
+                yield {"cell": cell, "result": fut.result(), "done": done, "started": started, "queued": len(queue)}
@@ -0,0 +1,243 @@
+import os
+import math
+import time
+import threading
+import logging
+import datetime as dt
+from contextlib import closing
+
+LATENCY_BUCKETS_S = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6)
+# host:port of the standalone /metrics endpoint; empty disables it
+METRICS_ADDR = os.environ.get("ANOMALILAB_METRICS_ADDR", "127.0.0.1:9464")
+
+log = logging.getLogger(__name__)
+
+class Metrics:
+    """Thread-safe counters and histograms with labels, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = {}  # name -> (type, help, buckets)
+        self._counters = {}  # (name, labels) -> value
+        self._hists = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def counter(self, name: str, help: str):
+        self._meta[name] = ("counter", help, None)
+
+    def histogram(self, name: str, help: str, buckets):
+        self._meta[name] = ("histogram", help, tuple(buckets))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._meta[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._hists.setdefault(key, [0] * len(buckets) + [0.0, 0])
+            for i, b in enumerate(buckets):
+                if value <= b:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def render(self) -> str:
+        def _labels(items, extra=()):
+            items = list(items) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            for name, (kind, help, buckets) in self._meta.items():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                if kind == "counter":
+                    for (n, lab), v in sorted(self._counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{_labels(lab)} {v:g}")
+                    continue
+                for (n, lab), h in sorted(self._hists.items()):
+                    if n != name:
+                        continue
+                    for b, c in zip(buckets, h):
+                        lines.append(f"{name}_bucket{_labels(lab, [('le', f'{b:g}')])} {c}")
+                    lines.append(f"{name}_bucket{_labels(lab, [('le', '+Inf')])} {h[-1]}")
+                    lines.append(f"{name}_sum{_labels(lab)} {h[-2]:g}")
+                    lines.append(f"{name}_count{_labels(lab)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.counter("anomalilab_sh_requests_total", "Process API requests by layer and outcome (ok, error, budget).")
+metrics.counter("anomalilab_sh_processing_units_total", "Processing Units spent (x-processingunits-spent).")
+metrics.counter("anomalilab_sh_response_bytes_total", "Response payload bytes.")
+metrics.counter("anomalilab_sh_layer_fallbacks_total", "Layers replaced by zeros after a failed fetch.")
+metrics.counter("anomalilab_prefetch_lookups_total", "Scan-time fetches answered from the prefetch cache (hit) or not (miss).")
+metrics.histogram("anomalilab_sh_request_seconds", "Process API request latency.", LATENCY_BUCKETS_S)
+metrics.histogram("anomalilab_sh_response_bytes", "Process API response size.", BYTES_BUCKETS)
+
+_metrics_httpd = None
+_metrics_failed = set()  # addresses that could not be bound; not retried on every app rerun
+_metrics_lock = threading.Lock()
+
+def start_metrics_server(addr: str | None = None):
+    """Serve metrics.render() at http://<addr>/metrics from a daemon thread; returns the bound (host, port) or None.
+
+    addr defaults to ANOMALILAB_METRICS_ADDR (127.0.0.1:9464); use 0.0.0.0:<port>
+    to scrape from other hosts, and one port per process (app, each worker).
+    Idempotent per process. An empty addr, or a port already in use, leaves
+    the endpoint off with a warning; scans are never affected.
+    """
+    global _metrics_httpd
+    addr = METRICS_ADDR if addr is None else addr
+    with _metrics_lock:
+        if _metrics_httpd is not None:
+            return _metrics_httpd.server_address[:2]
+        if not addr or addr in _metrics_failed:
+            return None
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0].rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        host, _, port = addr.rpartition(":")
+        try:
+            httpd = ThreadingHTTPServer((host or "127.0.0.1", int(port)), Handler)
+        except (OSError, ValueError) as e:
+            _metrics_failed.add(addr)
+            log.warning("metrics endpoint not started on %s: %s", addr, e)
+            return None
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, name="metrics", daemon=True).start()
+        _metrics_httpd = httpd
+        log.info("metrics at http://%s:%s/metrics", *httpd.server_address[:2])
+        return httpd.server_address[:2]
+
+def estimate_pu(size, input_bands: int, float32: bool = True) -> float:
+    """Processing Units of one Process API request: 512x512 px, 3 input bands, 8/16-bit output = 1 PU."""
+    W, H = size
+    return max(0.005, W * H / 512**2) * max(1.0, input_bands / 3) * (2.0 if float32 else 1.0)
+
+class PUBudgetExceeded(RuntimeError):
+    pass
+
+RESERVATION_TTL_S = 600.0  # a reservation of a process that died mid-request stops counting after this
+
+_LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spend (day TEXT PRIMARY KEY, pu REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS reservations (id INTEGER PRIMARY KEY, day TEXT NOT NULL, pu REAL NOT NULL, expires REAL NOT NULL);
+"""
+
+class PUBudget:
+    """Per-day Processing Unit budget shared by every process (app, workers) through one SQLite ledger.
+
+    reserve() atomically claims a request's estimate against the daily limit
+    before it is sent, so concurrent requests cannot overshoot it together;
+    settle() swaps the claim for the PU actually spent. daily_limit None (or
+    <= 0) disables enforcement and persistence; spend is then only counted
+    in this process.
+    """
+
+    def __init__(self, daily_limit: float | None = None, path: str | None = None):
+        self.daily_limit = daily_limit if daily_limit and daily_limit > 0 else None
+        self.path = path if self.daily_limit is not None else None
+        self._lock = threading.Lock()
+        self._local = {}  # day -> PU, without a ledger
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with closing(self._connect()) as db:
+                db.executescript(_LEDGER_SCHEMA)
+
+    def _connect(self):
+        import sqlite3
+        return sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+
+    @staticmethod
+    def _today() -> str:
+        return dt.date.today().isoformat()
+
+    @staticmethod
+    def _committed(db, day: str, now: float) -> float:
+        spent = db.execute("SELECT pu FROM spend WHERE day=?", (day,)).fetchone()
+        held = db.execute("SELECT COALESCE(SUM(pu), 0) FROM reservations WHERE day=? AND expires>?", (day, now)).fetchone()
+        return (spent[0] if spent else 0.0) + held[0]
+
+    def spent_today(self) -> float:
+        if not self.path:
+            with self._lock:
+                return float(self._local.get(self._today(), 0.0))
+        with closing(self._connect()) as db:
+            row = db.execute("SELECT pu FROM spend WHERE day=?", (self._today(),)).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def remaining(self) -> float:
+        """PU left today, net of requests in flight in any process."""
+        if self.daily_limit is None:
+            return math.inf
+        with closing(self._connect()) as db:
+            return max(0.0, self.daily_limit - self._committed(db, self._today(), time.time()))
+
+    def reserve(self, estimate: float):
+        """Claim estimate PU of today's budget; returns a reservation for settle(), or raises PUBudgetExceeded."""
+        if not self.path:
+            return None
+        day, now = self._today(), time.time()
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                committed = self._committed(db, day, now)
+                if committed + estimate > self.daily_limit:
+                    raise PUBudgetExceeded(f"Günlük Processing Unit bütçesi aşıldı ({committed:.1f}/{self.daily_limit:g} PU).")
+                rid = db.execute("INSERT INTO reservations (day, pu, expires) VALUES (?, ?, ?)",
+                                 (day, estimate, now + RESERVATION_TTL_S)).lastrowid
+                db.execute("DELETE FROM reservations WHERE expires<=?", (now,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return rid
+
+    def settle(self, reservation, pu: float):
+        """Release a reservation and book the PU actually spent (0 for a failed request)."""
+        day = self._today()
+        if not self.path:
+            with self._lock:
+                self._local = {day: self._local.get(day, 0.0) + pu}
+            return
+        with closing(self._connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM reservations WHERE id=?", (reservation,))
+            if pu:
+                db.execute("INSERT INTO spend (day, pu) VALUES (?, ?) ON CONFLICT(day) DO UPDATE SET pu = pu + excluded.pu", (day, pu))
+            db.execute("COMMIT")
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def pu_budget() -> PUBudget:
+    """Process-wide budget; limit from SH_PU_DAILY_BUDGET, ledger under the fetch store directory."""
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            from .sentinelhub_fetch import _secret
+            from .fetch_store import STORE_DIR
+            limit = _secret("SH_PU_DAILY_BUDGET")
+            _budget = PUBudget(float(limit) if limit else None, os.path.join(STORE_DIR, "pu_ledger.sqlite"))
+        return _budget
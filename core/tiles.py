@@ -0,0 +1,181 @@
+import os
+import struct
+import logging
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+TILE_PX = 256
+TILE_PORT = int(os.environ.get("ANOMALILAB_TILE_PORT", "8765"))
+# URL the browser uses to reach the tile endpoint (differs from the bind address behind a proxy);
+# unset -> http://localhost:<bound port>
+TILE_URL = os.environ.get("ANOMALILAB_TILE_URL")
+MAX_LAYERS = 32
+MAX_CACHED_TILES = 4096
+OVERLAY_ALPHA = 190
+
+# blue -> cyan -> yellow -> red, matching the POS/NEG marker colours on the map
+_ANCHORS = np.array([
+    [0.00, 37, 99, 235],
+    [0.35, 34, 211, 238],
+    [0.65, 250, 204, 21],
+    [1.00, 239, 68, 68],
+])
+
+def _lut() -> np.ndarray:
+    t = np.linspace(0, 1, 256)
+    lut = np.empty((257, 4), dtype=np.uint8)
+    for ch in range(3):
+        lut[:256, ch] = np.interp(t, _ANCHORS[:, 0], _ANCHORS[:, ch + 1]).round()
+    lut[:256, 3] = OVERLAY_ALPHA
+    lut[256] = 0  # outside the heatmap: transparent
+    return lut
+
+_LUT = _lut()
+
+log = logging.getLogger(__name__)
+
+def encode_png_rgba(rgba: np.ndarray) -> bytes:
+    H, W, _ = rgba.shape
+    raw = np.empty((H, W * 4 + 1), dtype=np.uint8)
+    raw[:, 0] = 0  # filter: none
+    raw[:, 1:] = rgba.reshape(H, W * 4)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", W, H, 8, 6, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6))
+            + chunk(b"IEND", b""))
+
+_EMPTY_TILE = encode_png_rgba(np.zeros((TILE_PX, TILE_PX, 4), dtype=np.uint8))
+
+def _tile_lonlat(z: int, x: int, y: int):
+    """Lon (W,) and lat (H,) of pixel centres of a Web Mercator XYZ tile."""
+    n = 2.0 ** z
+    f = (np.arange(TILE_PX) + 0.5) / TILE_PX
+    lon = (x + f) / n * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y + f) / n))))
+    return lon, lat
+
+class HeatmapTiles:
+    """Colour-mapped XYZ tiles of a heatmap georeferenced by its lon/lat bounds, rendered on demand."""
+
+    def __init__(self, heatmap: np.ndarray, georef: dict):
+        hm = np.asarray(heatmap, dtype=np.float32)
+        self.q = np.clip(hm * 255.0 + 0.5, 0, 255).astype(np.uint8)
+        self.bounds = (georef["lon_min"], georef["lat_min"], georef["lon_max"], georef["lat_max"])
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        lon_min, lat_min, lon_max, lat_max = self.bounds
+        H, W = self.q.shape
+        lon, lat = _tile_lonlat(z, x, y)
+        cols = np.rint((lon - lon_min) / (lon_max - lon_min) * (W - 1)).astype(np.int64)
+        rows = np.rint((lat_max - lat) / (lat_max - lat_min) * (H - 1)).astype(np.int64)
+        cin = (cols >= 0) & (cols < W)
+        rin = (rows >= 0) & (rows < H)
+        if not cin.any() or not rin.any():
+            return _EMPTY_TILE
+        idx = np.full((TILE_PX, TILE_PX), 256, dtype=np.int64)
+        inside = rin[:, None] & cin[None, :]
+        idx[inside] = self.q[np.clip(rows, 0, H - 1)[:, None], np.clip(cols, 0, W - 1)[None, :]][inside]
+        return encode_png_rgba(_LUT[idx])
+
+class TileServer:
+    """Process-wide local tile endpoint: /tiles/<layer>/<z>/<x>/<y>.png with an LRU tile cache."""
+
+    def __init__(self, port: int = TILE_PORT, host: str = "127.0.0.1"):
+        self.port, self.host = port, host
+        self._layers = OrderedDict()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def publish(self, heatmap: np.ndarray, georef: dict) -> str:
+        layer = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._layers[layer] = HeatmapTiles(heatmap, georef)
+            while len(self._layers) > MAX_LAYERS:
+                old, _ = self._layers.popitem(last=False)
+                for k in [k for k in self._cache if k[0] == old]:
+                    del self._cache[k]
+        return layer
+
+    def url_template(self, layer: str) -> str:
+        base = TILE_URL or f"http://localhost:{self.port}"
+        return f"{base}/tiles/{layer}/{{z}}/{{x}}/{{y}}.png"
+
+    def tile(self, layer: str, z: int, x: int, y: int):
+        key = (layer, z, x, y)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            src = self._layers.get(layer)
+        if src is None:
+            return None
+        png = src.render(z, x, y)
+        with self._lock:
+            self._cache[key] = png
+            while len(self._cache) > MAX_CACHED_TILES:
+                self._cache.popitem(last=False)
+        return png
+
+    def start(self):
+        if self._httpd is not None:
+            return self
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.split("?")[0].strip("/").split("/")
+                png = None
+                if len(parts) == 5 and parts[0] == "tiles" and parts[4].endswith(".png"):
+                    try:
+                        png = server.tile(parts[1], int(parts[2]), int(parts[3]), int(parts[4][:-4]))
+                    except ValueError:
+                        png = None
+                if png is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(png)))
+                self.send_header("Cache-Control", "public, max-age=86400, immutable")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(png)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            if self.port == 0:
+                raise
+            if TILE_URL:
+                # a pinned public URL (proxy) only reaches the configured port; a fallback port would break the overlay silently
+                raise RuntimeError(f"Karo sunucusu {self.host}:{self.port} portuna bağlanamadı ({e}); "
+                                   f"ANOMALILAB_TILE_URL={TILE_URL} bu porta yönlendiriyor. Portu boşaltın veya ANOMALILAB_TILE_PORT'u değiştirin.") from e
+            # port taken (a second app instance, a worker on this host): any free port will do
+            self._httpd = ThreadingHTTPServer((self.host, 0), Handler)
+            log.warning("tile port %s unavailable (%s); serving tiles on port %s", self.port, e, self._httpd.server_address[1])
+        self.port = self._httpd.server_address[1]
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="tile-server", daemon=True).start()
+        return self
+
+_server = None
+_server_lock = threading.Lock()
+
+def get_tile_server() -> TileServer:
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = TileServer().start()
+        return _server
@@ -0,0 +1,145 @@
+"""Scan worker fleet on the durable job queue (core/jobqueue.py).
+
+    python -m core.worker submit --bbox 35.0 39.0 35.02 39.02 [--layers radar,optic] [--real]
+    python -m core.worker work [--name host-1] [--once] [--lease 120] [--metrics-addr 0.0.0.0:9465]
+    python -m core.worker status [JOB_ID]
+
+Every command takes --queue DIR (default $ANOMALILAB_QUEUE or ./jobs); run
+workers on as many hosts as share that directory. Without --real, or
+without Sentinel Hub credentials, jobs run on demo data fully offline.
+A worker serves its fetch telemetry at http://<metrics-addr>/metrics
+(default $ANOMALILAB_METRICS_ADDR or 127.0.0.1:9464; give each worker on
+a host its own port, or "" to disable).
+"""
+import os
+import sys
+import time
+import socket
+import logging
+import argparse
+import threading
+import traceback
+from .jobqueue import JobQueue, QUEUE_DIR, DEFAULT_LEASE_S, roi_from_dict
+
+log = logging.getLogger(__name__)
+
+def run_job(queue: JobQueue, job: dict, worker: str, lease_s: float = DEFAULT_LEASE_S) -> str:
+    """Run one leased job with a heartbeat thread; returns the job's new state."""
+    from .pipeline import run_scan_pipeline
+    stop = threading.Event()
+    lost = threading.Event()
+
+    def _beat():
+        while not stop.wait(lease_s / 3.0):
+            if not queue.heartbeat(job["id"], worker, lease_s):
+                lost.set()
+                return
+
+    hb = threading.Thread(target=_beat, name=f"heartbeat-{job['id']}", daemon=True)
+    hb.start()
+    try:
+        # a missing local raster would silently turn the scan into demo data; fail (and retry elsewhere) instead
+        missing = [p for p in (job["params"].get("local_rasters") or {}).values() if not os.path.exists(p)]
+        if missing:
+            raise RuntimeError(f"Yerel raster bu worker'da bulunamadı: {', '.join(missing)}")
+        result = run_scan_pipeline(roi_from_dict(job["roi"]), settings=job["settings"], use_real_data=job["use_real_data"], **job["params"])
+        path = queue.save_result(job["id"], result)
+    except Exception:
+        stop.set()
+        state = queue.fail(job["id"], worker, traceback.format_exc(limit=5))
+        log.warning("job %s failed (attempt %s), now %s", job["id"], job["attempts"], state)
+        return state
+    finally:
+        stop.set()
+        hb.join()
+    if lost.is_set() or not queue.complete(job["id"], worker, path):
+        log.warning("job %s: lease lost, result written but not committed", job["id"])
+        return "lost"
+    return "done"
+
+def work(queue: JobQueue, worker: str | None = None, lease_s: float = DEFAULT_LEASE_S, poll_s: float = 2.0,
+         once: bool = False, max_jobs: int | None = None) -> int:
+    """Lease and run jobs until interrupted (or the queue is idle, with once=True); returns jobs run."""
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    n = 0
+    while max_jobs is None or n < max_jobs:
+        job = queue.lease(worker, lease_s)
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_s)
+            continue
+        t0 = time.perf_counter()
+        state = run_job(queue, job, worker, lease_s)
+        n += 1
+        log.info("job %s -> %s in %.1fs", job["id"], state, time.perf_counter() - t0)
+    return n
+
+def _fmt_time(t) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) if t else "-"
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m core.worker", description=__doc__.splitlines()[0])
+    ap.add_argument("--queue", default=QUEUE_DIR, help="queue directory shared by all workers")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("submit", help="queue a scan of a lon/lat bbox")
+    s.add_argument("--bbox", type=float, nargs=4, metavar=("MINLON", "MINLAT", "MAXLON", "MAXLAT"), required=True)
+    s.add_argument("--layers", default="radar,optic", help="comma list of radar,optic,thermal")
+    s.add_argument("--real", action="store_true", help="use Sentinel Hub (falls back to demo without credentials)")
+    s.add_argument("--m-per-px", type=float, default=None)
+    s.add_argument("--extraction", choices=("peaks", "components"), default="peaks")
+    s.add_argument("--max-attempts", type=int, default=3)
+
+    w = sub.add_parser("work", help="run a worker")
+    w.add_argument("--name", default=None)
+    w.add_argument("--lease", type=float, default=DEFAULT_LEASE_S)
+    w.add_argument("--poll", type=float, default=2.0)
+    w.add_argument("--once", action="store_true", help="exit when the queue is idle")
+    w.add_argument("--metrics-addr", default=None, help="host:port of the Prometheus /metrics endpoint (\"\" disables)")
+
+    t = sub.add_parser("status", help="list jobs, or show one")
+    t.add_argument("job_id", nargs="?")
+    t.add_argument("--limit", type=int, default=20)
+
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    queue = JobQueue(args.queue)
+
+    if args.cmd == "submit":
+        from .roi import roi_from_bbox
+        layers = {x.strip() for x in args.layers.split(",") if x.strip()}
+        settings = {k: k in layers for k in ("radar", "optic", "thermal")}
+        settings["magnetic"] = False
+        params = {"extraction": args.extraction}
+        if args.m_per_px:
+            params["target_m_per_px"] = args.m_per_px
+        print(queue.submit(roi_from_bbox(*args.bbox), settings, use_real_data=args.real, max_attempts=args.max_attempts, **params))
+        return 0
+
+    if args.cmd == "work":
+        from .telemetry import start_metrics_server
+        start_metrics_server(args.metrics_addr)
+        try:
+            n = work(queue, args.name, lease_s=args.lease, poll_s=args.poll, once=args.once)
+        except KeyboardInterrupt:
+            return 130
+        print(f"{n} job(s) run")
+        return 0
+
+    if args.job_id:
+        job = queue.get(args.job_id)
+        if job is None:
+            print(f"no such job: {args.job_id}", file=sys.stderr)
+            return 1
+        for k in ("id", "state", "attempts", "max_attempts", "lease_owner", "error", "result_path"):
+            print(f"{k:13} {job[k]}")
+        print(f"{'created':13} {_fmt_time(job['created'])}\n{'updated':13} {_fmt_time(job['updated'])}")
+        return 0
+    print(" ".join(f"{k}={v}" for k, v in sorted(queue.counts().items())) or "queue empty")
+    for j in queue.list(args.limit):
+        print(f"{j['id']}  {j['state']:7} {j['attempts']}/{j['max_attempts']}  {_fmt_time(j['updated'])}  {j['lease_owner'] or ''}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
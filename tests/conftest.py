@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the repo root holds the core package (as bench/ scripts do)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from core.ablation import run_ablation
+from core.grid import plan_grid
+from core.pipeline import run_scan_pipeline
+from core.roi import roi_from_bbox
+
+BBOX = (35.0, 39.0, 35.03, 39.025)
+ROI = roi_from_bbox(*BBOX)
+
+@pytest.fixture
+def rasters(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_bounds
+    plan = plan_grid(ROI)
+    y, x = np.mgrid[:plan.H, :plan.W]
+    rng = np.random.default_rng(11)
+    paths = {}
+    for name, (cx, cy, s) in {"magnetic": (80, 60, 4.0), "dem": (180, 150, 9.0)}.items():
+        data = rng.normal(0, 1, (plan.H, plan.W)) + 5 * np.exp(-((x - cx)**2 + (y - cy)**2) / (2 * s * s))
+        paths[name] = str(tmp_path / f"{name}.tif")
+        with rasterio.open(paths[name], "w", driver="GTiff", width=plan.W, height=plan.H, count=1, dtype="float32",
+                           crs="EPSG:4326", transform=from_bounds(*BBOX, plan.W, plan.H)) as dst:
+            dst.write(data.astype(np.float32), 1)
+    return paths
+
+def test_every_subset_matches_its_own_scan(rasters):
+    settings = {"magnetic": True}
+    ab = run_ablation(ROI, settings, local_rasters=rasters)
+    assert [s["layers"] for s in ab["subsets"]] == [["magnetic"], ["dem"], ["magnetic", "dem"]]
+    for sub in ab["subsets"]:
+        solo = run_scan_pipeline(ROI, {"magnetic": "magnetic" in sub["layers"]},
+                                 local_rasters={k: rasters[k] for k in sub["layers"]})
+        np.testing.assert_allclose(sub["heatmap"], solo["heatmap"], atol=1e-5)
+        got, want = sub["anomaly_points"], solo["anomaly_points"]
+        assert [(p["lat"], p["lon"], p["polarity"]) for p in got] == [(p["lat"], p["lon"], p["polarity"]) for p in want]
+        np.testing.assert_allclose([p["sigma_px"] for p in got], [p["sigma_px"] for p in want], rtol=0.03)
+    assert ab["subsets"][-1]["match_full"] == 1.0
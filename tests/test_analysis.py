@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from core.analysis import (DOG_HALO_PX, band_sigma, compute_anomaly_heatmap_chunked, difference_of_gaussians,
+                           normalize_heatmap, scale_space_dog)
+
+SIGMAS = (1.5, 2.5, 4.0, 6.0, 12.0)
+PITCH = 200
+
+def _blobs(noise: float = 0.0):
+    H, W = PITCH, PITCH * len(SIGMAS)
+    y, x = np.mgrid[:H, :W]
+    r = np.zeros((H, W), dtype=np.float32)
+    for j, s in enumerate(SIGMAS):
+        r += np.exp(-((x - PITCH // 2 - PITCH * j)**2 + (y - PITCH // 2)**2) / (2 * s * s)).astype(np.float32)
+    if noise:
+        r += np.random.default_rng(0).normal(0, noise, r.shape).astype(np.float32)
+    return r
+
+@pytest.mark.parametrize("noise", [0.0, 0.05])
+def test_scale_of_synthetic_blobs(noise):
+    _, code = scale_space_dog(_blobs(noise), {})
+    est = [float(band_sigma(code[PITCH // 2, PITCH // 2 + PITCH * j])) for j in range(len(SIGMAS))]
+    np.testing.assert_allclose(est, SIGMAS, rtol=0.05)
+
+def test_dog_matches_two_blur_dog():
+    r = _blobs(0.3)
+    dog, _ = scale_space_dog(r, {"radar": True})
+    np.testing.assert_allclose(dog, difference_of_gaussians(r, {"radar": True}), atol=1e-4)
+
+def test_window_with_origin_matches_full_grid():
+    r = _blobs(0.05)
+    full_dog, full_code = scale_space_dog(r, {})
+    r0, c0 = 37, 292  # window origin off the 2x and 4x decimation lattices
+    win = r[:, c0 - DOG_HALO_PX:c0 + 60 + DOG_HALO_PX]
+    dog, code = scale_space_dog(win, {}, origin=(0, c0 - DOG_HALO_PX))
+    core = (slice(r0, r0 + 60), slice(DOG_HALO_PX, DOG_HALO_PX + 60))
+    np.testing.assert_allclose(dog[core], full_dog[r0:r0 + 60, c0:c0 + 60], atol=1e-5)
+    np.testing.assert_array_equal(code[core], full_code[r0:r0 + 60, c0:c0 + 60])
+
+@pytest.mark.parametrize("as_path", [False, True])
+def test_chunked_matches_single_pass(tmp_path, as_path):
+    r = _blobs(0.3)
+    dog, code = scale_space_dog(r, {"optic": True})
+    src = r
+    if as_path:
+        src = str(tmp_path / "raster.npy")
+        np.save(src, r)
+    heat, codes = compute_anomaly_heatmap_chunked(src, str(tmp_path / "heat.npy"), {"optic": True}, block=90, workers=3)
+    assert isinstance(heat, np.memmap)
+    np.testing.assert_allclose(heat, normalize_heatmap(dog), atol=1e-6)
+    np.testing.assert_array_equal(codes, code)
+    np.testing.assert_array_equal(np.load(tmp_path / "heat.npy"), heat)
+
+def test_chunked_reads_windows_from_a_callable(tmp_path):
+    r = _blobs(0.3)
+    seen = []
+
+    def read(w):
+        seen.append(w)
+        return r[w[0]:w[1], w[2]:w[3]]
+
+    heat, _ = compute_anomaly_heatmap_chunked(read, str(tmp_path / "heat.npy"), {}, block=128, workers=2, shape=r.shape)
+    np.testing.assert_allclose(heat, normalize_heatmap(scale_space_dog(r, {})[0]), atol=1e-6)
+    assert max((w[1] - w[0]) * (w[3] - w[2]) for w in seen) < r.size
@@ -0,0 +1,63 @@
+import io
+import json
+import shutil
+import subprocess
+import numpy as np
+import pytest
+import tifffile
+from core.sentinelhub_fetch import S1_CODEC, S2_CODEC, THERMAL_CODEC, decode_tiff, _evalscript
+
+def encode(codec, v: np.ndarray) -> np.ndarray:
+    """Python mirror of codec.js(): what the evalscript sends for v."""
+    v = np.asarray(v, dtype=np.float64)
+    if codec.kind == "dn":
+        return v.astype(np.uint16)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = 10 * np.log10(v) if codec.kind == "db" else v
+        dn = np.clip(np.floor((x - codec.lo) / codec.step + 0.5) + 1, 1, 65535)
+    nodata = ~np.isfinite(v) | ((v <= 0) if codec.kind == "db" else (v == 0))
+    dn[nodata] = 0
+    return dn.astype(np.uint16)
+
+def _tiff(a: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    tifffile.imwrite(buf, a, photometric="minisblack")
+    return buf.getvalue()
+
+def test_db_codec_round_trip():
+    v = np.geomspace(1e-5, 10, 4096).reshape(64, 64, 1)
+    out = decode_tiff(_tiff(encode(S1_CODEC, v)), S1_CODEC)
+    assert out.dtype == np.float32 and out.shape == v.shape
+    # dB steps of ~0.0012 are a relative error below 0.03 %
+    assert np.max(np.abs(out - v) / v) < 3e-4
+
+def test_linear_codec_round_trip_and_no_data():
+    v = np.linspace(-1, 2, 64 * 64 * 4).reshape(64, 64, 4)
+    v[0, 0] = 0.0
+    v[1, 1] = np.nan
+    out = decode_tiff(_tiff(encode(S2_CODEC, v)), S2_CODEC)
+    ok = np.isfinite(v)
+    assert np.max(np.abs(out[ok] - v[ok])) <= S2_CODEC.step / 2 + 1e-6
+    assert (out[0, 0] == 0).all() and (out[1, 1] == 0).all()
+    # out of range values clip to the codec's range
+    clipped = decode_tiff(_tiff(encode(S2_CODEC, np.array([[[-5.0, 9.0]]]))), S2_CODEC)
+    np.testing.assert_allclose(clipped.ravel(), [S2_CODEC.lo, S2_CODEC.hi], atol=1e-4)
+
+def test_dn_codec_passes_through():
+    v = np.arange(64 * 64, dtype=np.uint16).reshape(64, 64)
+    out = decode_tiff(_tiff(encode(THERMAL_CODEC, v)), THERMAL_CODEC)
+    assert out.shape == (64, 64, 1)
+    np.testing.assert_array_equal(out[..., 0], v)
+
+def test_float32_payload_decodes_unchanged():
+    v = np.random.default_rng(0).normal(size=(32, 48, 3)).astype(np.float32)
+    np.testing.assert_array_equal(decode_tiff(_tiff(v)), v)
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run the evalscript")
+@pytest.mark.parametrize("codec", [S1_CODEC, S2_CODEC])
+def test_evalscript_encoder_matches_mirror(codec):
+    vals = [1e-4, 0.02, 0.5, 1.0, 1.9, -0.3, 0.0, 1e9]
+    script = _evalscript('{bands: ["A"]}', 1, "return [s.A];", codec)
+    script += f"console.log(JSON.stringify({json.dumps(vals)}.map(v => evaluatePixel({{A: v}})[0])));"
+    got = json.loads(subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout)
+    assert got == encode(codec, np.array(vals)).tolist()
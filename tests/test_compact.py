@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from core.compact import QuantizedGrid, quantize_grid, compact_result, grid_of, deep_nbytes
+
+@pytest.fixture
+def grid():
+    return np.random.default_rng(5).normal(3.0, 2.0, (120, 90)).astype(np.float32)
+
+def test_uint8_error_bound(grid):
+    q = quantize_grid(grid, "uint8")
+    assert q.data.dtype == np.uint8 and q.nbytes == grid.size
+    err = np.abs(q.dequantize() - grid).max()
+    assert err <= (grid.max() - grid.min()) / 508 * (1 + 1e-5)
+    # the extremes are reproduced
+    assert np.isclose(q.dequantize().min(), grid.min()) and np.isclose(q.dequantize().max(), grid.max(), rtol=1e-6)
+
+def test_float16_error_bound(grid):
+    q = quantize_grid(grid, "float16")
+    rel = np.abs(q.dequantize() - grid) / np.maximum(np.abs(grid), 1e-3)
+    assert rel.max() <= 2.0 ** -11 * 1.01
+
+def test_nan_and_constant_grids():
+    a = np.array([[1.0, np.nan], [2.0, 3.0]], dtype=np.float32)
+    out = quantize_grid(a, "uint8").dequantize()
+    assert np.isnan(out[0, 1]) and np.allclose(out[~np.isnan(a)], a[~np.isnan(a)], atol=2 / 508)
+    np.testing.assert_array_equal(quantize_grid(np.full((3, 3), 7.0), "uint8").dequantize(), 7.0)
+    assert np.isnan(quantize_grid(np.full((2, 2), np.nan), "uint8").dequantize()).all()
+    with pytest.raises(ValueError):
+        quantize_grid(a, "int4")
+
+def test_compact_result_keeps_points_and_drops_raster(grid):
+    res = {"heatmap": grid, "raster": grid.copy(), "change_heatmap": None, "anomaly_points": [{"lat": 1.0}]}
+    c = compact_result(res, "uint8")
+    assert c["raster"] is None and c["anomaly_points"] is res["anomaly_points"]
+    assert isinstance(c["heatmap"], QuantizedGrid) and grid_of(c, "change_heatmap") is None
+    assert grid_of(c).shape == grid.shape and grid_of(res) is grid
+    assert deep_nbytes(c) < deep_nbytes(res) / 4
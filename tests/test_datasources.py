@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from core.datasources import _demo_raster, _demo_rows, _moments, fuse_bands
+
+def _bands():
+    rng = np.random.default_rng(7)
+    bands = [rng.normal(m, s, (50, 70)).astype(np.float32) for m, s in ((0, 1), (100, 20), (-3, 0.1))]
+    bands[0][:10, :10] = np.nan
+    bands[1][5:15, 5:15] = np.nan  # overlaps band 0: some pixels have no valid band at all
+    bands[2][5:12, 5:12] = np.nan
+    return bands
+
+def _reference(bands):
+    z = np.stack([(b - np.nanmean(b)) / (np.nanstd(b) + 1e-6) for b in bands]).astype(np.float64)
+    n = np.isfinite(z).sum(axis=0)
+    return np.where(n > 0, np.nansum(z, axis=0) / np.maximum(n, 1), 0.0)
+
+def test_fuse_matches_stacked_nan_mean():
+    bands = _bands()
+    ref = _reference(bands)
+    ref = (ref - ref.mean()) / (ref.std() + 1e-6)
+    out = fuse_bands(iter(bands), bands[0].shape)
+    assert out.dtype == np.float32
+    np.testing.assert_allclose(out, ref, atol=1e-5)
+    assert np.all(out[5:10, 5:10] == out[5, 5])  # no valid band: the fused mean
+    assert np.isfinite(out).all()
+
+def test_windows_with_grid_stats_join_without_seams():
+    bands = _bands()
+    stats = [(np.nanmean(b), np.nanstd(b)) for b in bands]
+    whole = fuse_bands(bands, bands[0].shape, stats=stats)
+    tiled = np.empty_like(whole)
+    for r0, c0 in ((0, 0), (0, 35), (25, 0), (25, 35)):
+        tiled[r0:r0 + 25, c0:c0 + 35] = fuse_bands((b[r0:r0 + 25, c0:c0 + 35] for b in bands), (25, 35), stats=stats)
+    np.testing.assert_array_equal(tiled, whole)
+    np.testing.assert_allclose(whole, _reference(bands), atol=1e-5)
+
+def test_fuse_needs_a_band():
+    with pytest.raises(RuntimeError, match="no_features_enabled"):
+        fuse_bands(iter(()), (4, 4))
+
+def test_demo_rows_equal_one_draw():
+    H, W = 90, 40
+    full = np.concatenate([rows for _, _, rows in _demo_rows(H, W, chunk_rows=H)])
+    chunked = np.concatenate([rows for _, _, rows in _demo_rows(H, W, chunk_rows=32)])
+    np.testing.assert_array_equal(chunked, full)
+    (mean, std), = _moments([(full.size, full.astype(np.float64).sum(), np.dot(full.ravel().astype(np.float64), full.ravel()))])
+    np.testing.assert_allclose((full - mean) / (std + 1e-6), _demo_raster(H, W), atol=1e-5)
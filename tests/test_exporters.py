@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+import numpy as np
+import pytest
+from core.exporters import EXPORT_FORMATS, export_zip_bytes, export_all
+from core.geo import georef_from_bounds
+from core.roi import roi_from_bbox
+
+BOUNDS = (35.0, 39.0, 35.02, 39.01)
+H, W = 40, 60
+
+@pytest.fixture
+def result():
+    rng = np.random.default_rng(3)
+    heat = rng.random((H, W)).astype(np.float32)
+    pts = [{"lat": 39.005, "lon": 35.01, "score": 0.9, "polarity": "POS", "z_rel": 1.2, "depth_m": 3.0, "volume_m3": 10.0},
+           {"lat": 39.00123456, "lon": 35.01987654, "score": 0.05, "polarity": "NEG", "z_rel": -1.8, "depth_m": 4.6, "volume_m3": 17.4}]
+    return {"roi": roi_from_bbox(*BOUNDS), "heatmap": heat, "raster": None, "anomaly_points": pts,
+            "georef": georef_from_bounds(*BOUNDS, H, W)}
+
+def test_esri_flt_always_ships_its_header(result):
+    names = zipfile.ZipFile(io.BytesIO(export_zip_bytes(result, ["ESRI_FLT"]))).namelist()
+    assert names == ["heatmap.flt", "heatmap.hdr"]
+
+def test_zip_holds_every_format_file(result):
+    names = zipfile.ZipFile(io.BytesIO(export_zip_bytes(result))).namelist()
+    assert names == [name for files in EXPORT_FORMATS.values() for name, _, _ in files]
+    with pytest.raises(ValueError):
+        export_zip_bytes(result, [])
+
+def test_export_all_matches_zip(result, tmp_path):
+    paths = export_all(result, str(tmp_path))
+    zf = zipfile.ZipFile(io.BytesIO(export_zip_bytes(result)))
+    for label in ("GeoTIFF", "ESRI_ASCII", "Surfer7_GRD", "GeoJSON"):
+        with open(paths[label], "rb") as f:
+            assert f.read() == zf.read(EXPORT_FORMATS[label][0][0])
+    assert [p.rsplit(".", 1)[1] for p in paths["ESRI_FLT"]] == ["flt", "hdr"]
+
+@pytest.mark.parametrize("label", ["GeoTIFF", "ESRI_ASCII", "ESRI_FLT"])
+def test_grid_exports_round_trip(result, tmp_path, label):
+    rasterio = pytest.importorskip("rasterio")
+    path = export_all(result, str(tmp_path))[label]
+    path = path[0] if isinstance(path, tuple) else path
+    with rasterio.open(path) as src:
+        np.testing.assert_allclose(tuple(src.bounds), BOUNDS, atol=1e-9)
+        assert (src.height, src.width) == (H, W)
+        # text grids keep 6 decimals; binary grids are exact float32
+        np.testing.assert_allclose(src.read(1), result["heatmap"], atol=1e-6 if label == "ESRI_ASCII" else 0)
+
+def test_surfer_grids_round_trip(result, tmp_path):
+    import struct
+    paths = export_all(result, str(tmp_path))
+    with open(paths["Surfer7_GRD"], "rb") as f:
+        buf = f.read()
+    rows, cols = struct.unpack_from("<ii", buf, 20)
+    xlo, ylo, xsize, ysize = struct.unpack_from("<4d", buf, 28)
+    assert (rows, cols) == (H, W)
+    np.testing.assert_allclose((xlo, ylo, xlo + xsize * (W - 1), ylo + ysize * (H - 1)), BOUNDS)
+    data = np.frombuffer(buf, "<f8", offset=len(buf) - H * W * 8).reshape(H, W)
+    np.testing.assert_array_equal(data[::-1], result["heatmap"].astype(np.float64))
+    with open(paths["Surfer_GRD"], encoding="utf-8") as f:
+        lines = f.read().split("\n")
+    assert lines[0] == "DSAA" and lines[1] == f"{W} {H}"
+    vals = np.array(" ".join(lines[5:]).split(), dtype=np.float64).reshape(H, W)
+    np.testing.assert_allclose(vals[::-1], result["heatmap"], atol=1e-6)
+
+def test_geojson_round_trip(result, tmp_path):
+    with open(export_all(result, str(tmp_path))["GeoJSON"], encoding="utf-8") as f:
+        fc = json.load(f)
+    roi, *pts = fc["features"]
+    assert roi["geometry"]["coordinates"][0] == [list(c) for c in result["roi"].polygon.exterior.coords]
+    for feat, p in zip(pts, result["anomaly_points"], strict=True):
+        assert feat["geometry"]["coordinates"] == [p["lon"], p["lat"]]
+        assert {k: feat["properties"][k] for k in ("polarity", "score", "z_rel")} == {k: p[k] for k in ("polarity", "score", "z_rel")}
+
+def _kml_points(text):
+    ns = {"k": "http://www.opengis.net/kml/2.2"}
+    marks = ET.fromstring(text).findall(".//k:Placemark", ns)
+    ring = marks[0].find(".//k:coordinates", ns).text.split()
+    pts = [(m.find("k:styleUrl", ns).text, m.find(".//k:coordinates", ns).text) for m in marks[1:]]
+    return ring, pts
+
+def test_kml_and_kmz_round_trip(result, tmp_path):
+    paths = export_all(result, str(tmp_path))
+    with open(paths["KML"], encoding="utf-8") as f:
+        kml = f.read()
+    assert zipfile.ZipFile(paths["KMZ"]).read("doc.kml").decode("utf-8") == kml
+    ring, pts = _kml_points(kml)
+    assert [tuple(map(float, c.split(","))) for c in ring] == list(result["roi"].polygon.exterior.coords)
+    assert pts == [(f"#{p['polarity']}", f"{p['lon']},{p['lat']}") for p in result["anomaly_points"]]
+
+def test_xyz_csv_round_trip(result, tmp_path):
+    with open(export_all(result, str(tmp_path))["XYZ_CSV"], encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [(float(r["x_lon"]), float(r["y_lat"]), float(r["z_score"]), r["polarity"], float(r["depth_m"])) for r in rows] == \
+        [(p["lon"], p["lat"], p["score"], p["polarity"], p["depth_m"]) for p in result["anomaly_points"]]
+
+def test_dxf_round_trip(result, tmp_path):
+    ezdxf = pytest.importorskip("ezdxf")
+    msp = ezdxf.readfile(export_all(result, str(tmp_path))["DXF"]).modelspace()
+    (poly,) = msp.query("POLYLINE")
+    ring = [tuple(v.dxf.location)[:2] for v in poly.vertices]
+    np.testing.assert_allclose(ring, list(result["roi"].polygon.exterior.coords)[:len(ring)], atol=1e-9)
+    pts = list(msp.query("POINT"))
+    assert [e.dxf.layer for e in pts] == [f"ANOM_{p['polarity']}" for p in result["anomaly_points"]]
+    # r12writer rounds coordinates to 6 decimals (~0.1 m in degrees)
+    np.testing.assert_allclose([tuple(e.dxf.location)[:2] for e in pts], [(p["lon"], p["lat"]) for p in result["anomaly_points"]], atol=5e-7)
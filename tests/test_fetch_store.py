@@ -0,0 +1,82 @@
+import datetime as dt
+import threading
+import numpy as np
+from core.fetch_store import FetchStore, bbox_key
+from core.sentinelhub_fetch import DEFAULT_TIME_INTERVAL
+
+BBOX = (35.0, 39.0, 35.01, 39.01)
+SIZE = (4, 3)
+
+class FakeFetch:
+    """Returns the queued arrays in order and records the requested time intervals."""
+
+    def __init__(self, *arrays):
+        self.arrays = list(arrays)
+        self.intervals = []
+
+    def __call__(self, bbox, size, time_interval):
+        self.intervals.append(time_interval)
+        return self.arrays.pop(0)
+
+def _full(v):
+    return np.full((SIZE[1], SIZE[0], 2), v, dtype=np.float32)
+
+def test_first_run_fetches_full_history_and_stores_date(tmp_path):
+    store = FetchStore(str(tmp_path))
+    fetch = FakeFetch(_full(1.0))
+    out = store.fetch_incremental("s1", fetch, BBOX, SIZE, today=dt.date(2024, 5, 1))
+    assert fetch.intervals == [(DEFAULT_TIME_INTERVAL[0], "2024-05-01")]
+    np.testing.assert_array_equal(out, _full(1.0))
+    assert str(store.load(bbox_key(BBOX, SIZE), "s1")["last_date"]) == "2024-05-01"
+
+def test_new_acquisitions_paint_over_stored_composite(tmp_path):
+    store = FetchStore(str(tmp_path))
+    store.fetch_incremental("s1", FakeFetch(_full(1.0)), BBOX, SIZE, today=dt.date(2024, 5, 1))
+    partial = np.zeros_like(_full(0.0))
+    partial[0, :] = 5.0  # only the first row has a new acquisition
+    fetch = FakeFetch(partial)
+    out = store.fetch_incremental("s1", fetch, BBOX, SIZE, today=dt.date(2024, 5, 10))
+    assert fetch.intervals == [("2024-05-02", "2024-05-10")]
+    assert (out[0] == 5.0).all() and (out[1:] == 1.0).all()
+    assert str(store.load(bbox_key(BBOX, SIZE), "s1")["last_date"]) == "2024-05-10"
+
+def test_same_day_is_served_from_store(tmp_path):
+    store = FetchStore(str(tmp_path))
+    store.fetch_incremental("s1", FakeFetch(_full(1.0)), BBOX, SIZE, today=dt.date(2024, 5, 1))
+    fetch = FakeFetch()
+    out = store.fetch_incremental("s1", fetch, BBOX, SIZE, today=dt.date(2024, 5, 1))
+    assert fetch.intervals == [] and (out == 1.0).all()
+
+def test_empty_response_does_not_advance_last_date(tmp_path):
+    store = FetchStore(str(tmp_path))
+    key = bbox_key(BBOX, SIZE)
+    # a failed first fetch (zeros) must not be stored, or the history would never be fetched again
+    store.fetch_incremental("thermal", FakeFetch(_full(0.0)), BBOX, SIZE, today=dt.date(2024, 5, 1))
+    assert store.load(key, "thermal") is None
+    fetch = FakeFetch(_full(2.0))
+    store.fetch_incremental("thermal", fetch, BBOX, SIZE, today=dt.date(2024, 5, 2))
+    assert fetch.intervals[0][0] == DEFAULT_TIME_INTERVAL[0]
+    # a fully clouded later window keeps the stored date and composite
+    out = store.fetch_incremental("thermal", FakeFetch(_full(0.0)), BBOX, SIZE, today=dt.date(2024, 5, 9))
+    assert (out == 2.0).all()
+    assert str(store.load(key, "thermal")["last_date"]) == "2024-05-02"
+
+def test_concurrent_saves_of_one_key(tmp_path):
+    store = FetchStore(str(tmp_path))
+    errors = []
+
+    def _save(i):
+        try:
+            for _ in range(20):
+                store.save("k", "heatmap", heatmap=np.full((8, 8), i, dtype=np.float32))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=_save, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert store.load("k", "heatmap")["heatmap"].shape == (8, 8)
+    assert [p.name for p in (tmp_path / "k").iterdir()] == ["heatmap.npz"]
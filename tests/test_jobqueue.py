@@ -0,0 +1,81 @@
+import pytest
+import core.jobqueue as jq
+from core.jobqueue import JobQueue
+from core.roi import roi_from_bbox
+from core.worker import run_job
+
+ROI = roi_from_bbox(35.0, 39.0, 35.002, 39.002)
+SETTINGS = dict(radar=True, optic=True, thermal=False, magnetic=False)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(jq.time, "time", lambda: now[0])
+    return now
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path))
+
+def test_lease_is_exclusive_and_ordered(queue, clock):
+    a = queue.submit(ROI, SETTINGS)
+    clock[0] += 1
+    b = queue.submit(ROI, SETTINGS, extraction="components")
+    first, second = queue.lease("w1"), queue.lease("w2")
+    assert (first["id"], second["id"]) == (a, b)
+    assert first["attempts"] == 1 and second["params"] == {"extraction": "components"}
+    assert queue.lease("w3") is None
+
+def test_expired_lease_is_taken_over(queue, clock):
+    job_id = queue.submit(ROI, SETTINGS)
+    queue.lease("w1", lease_s=10)
+    clock[0] += 11
+    job = queue.lease("w2", lease_s=10)
+    assert job["id"] == job_id and job["attempts"] == 2
+    # the old owner can no longer heartbeat, complete or fail the job
+    assert not queue.heartbeat(job_id, "w1")
+    assert not queue.complete(job_id, "w1", "x.json")
+    assert queue.fail(job_id, "w1", "boom") == "lost"
+    assert queue.get(job_id)["lease_owner"] == "w2"
+
+def test_heartbeat_keeps_the_lease(queue, clock):
+    job_id = queue.submit(ROI, SETTINGS)
+    queue.lease("w1", lease_s=10)
+    for _ in range(3):
+        clock[0] += 8
+        assert queue.heartbeat(job_id, "w1", lease_s=10)
+    assert queue.lease("w2") is None
+    assert queue.complete(job_id, "w1", "x.json")
+    assert queue.get(job_id)["state"] == "done"
+    assert not queue.heartbeat(job_id, "w1")
+
+def test_failures_retry_with_backoff_then_fail(queue, clock):
+    job_id = queue.submit(ROI, SETTINGS, max_attempts=2)
+    queue.lease("w1")
+    assert queue.fail(job_id, "w1", "boom") == "queued"
+    assert queue.lease("w1") is None  # backing off
+    clock[0] += jq.RETRY_BACKOFF_S
+    assert queue.lease("w2")["attempts"] == 2
+    assert queue.fail(job_id, "w2", "boom again") == "failed"
+    clock[0] += 3600
+    assert queue.lease("w1") is None
+    job = queue.get(job_id)
+    assert job["state"] == "failed" and job["error"] == "boom again"
+
+def test_expired_last_attempt_fails(queue, clock):
+    job_id = queue.submit(ROI, SETTINGS, max_attempts=1)
+    queue.lease("w1", lease_s=10)
+    clock[0] += 11
+    assert queue.lease("w2") is None
+    assert queue.get(job_id)["state"] == "failed"
+
+def test_run_job_round_trip(queue):
+    job_id = queue.submit(ROI, SETTINGS, target_m_per_px=5.0)
+    assert run_job(queue, queue.lease("w1"), "w1") == "done"
+    res = queue.load_result(job_id)
+    assert res["heatmap"].shape == (res["grid"]["H"], res["grid"]["W"]) and res["anomaly_points"]
+
+def test_run_job_fails_on_missing_local_raster(queue, tmp_path):
+    job_id = queue.submit(ROI, SETTINGS, max_attempts=1, local_rasters={"magnetic": str(tmp_path / "missing.tif")})
+    assert run_job(queue, queue.lease("w1"), "w1") == "failed"
+    assert "missing.tif" in queue.get(job_id)["error"]
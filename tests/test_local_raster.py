@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+from core.local_raster import read_local_window
+
+def test_aligned_window_is_read_without_resampling(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_bounds
+    bounds, H, W = (35.0, 39.0, 35.06, 39.05), 555, 520
+    data = np.random.default_rng(1).normal(0, 1, (H, W)).astype(np.float32)
+    data[:40, :50] = -9999
+    path = str(tmp_path / "mag.tif")
+    with rasterio.open(path, "w", driver="GTiff", width=W, height=H, count=1, dtype="float32", crs="EPSG:4326",
+                       transform=from_bounds(*bounds, W, H), nodata=-9999) as dst:
+        dst.write(data, 1)
+    dx, dy = (bounds[2] - bounds[0]) / W, (bounds[3] - bounds[1]) / H
+    # a 138 px tile whose bounds carry float noise (width 138.00000000006 px)
+    tile = read_local_window(path, (bounds[0], bounds[3] - 138 * dy, bounds[0] + 138 * dx, bounds[3]), (138, 138))
+    want = np.where(data[:138, :138] == -9999, np.nan, data[:138, :138])
+    np.testing.assert_array_equal(tile, want)
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from core.grid import plan_grid
+from core.pipeline import run_scan_pipeline
+from core.roi import roi_from_bbox
+
+BBOX = (35.0, 39.0, 35.06, 39.05)
+ROI = roi_from_bbox(*BBOX)
+
+def _assert_same_scan(single, tiled):
+    assert not single["grid"]["tiled"] and tiled["grid"]["tiled"]
+    np.testing.assert_allclose(tiled["heatmap"], single["heatmap"], atol=1e-5)
+    assert tiled["anomaly_points"] == single["anomaly_points"]
+
+def test_tiled_demo_scan_matches_single_pass():
+    settings = dict(radar=True, optic=True)
+    _assert_same_scan(run_scan_pipeline(ROI, settings, mem_budget_mb=256), run_scan_pipeline(ROI, settings, mem_budget_mb=8))
+
+def test_tiled_local_raster_scan_matches_single_pass(tmp_path):
+    rasterio = pytest.importorskip("rasterio")
+    from rasterio.transform import from_bounds
+    plan = plan_grid(ROI)
+    y, x = np.mgrid[:plan.H, :plan.W]
+    data = np.random.default_rng(5).normal(0, 1, (plan.H, plan.W)).astype(np.float32)
+    data += 6 * np.exp(-((x - 300)**2 + (y - 200)**2) / (2 * 15.0**2)).astype(np.float32)
+    data[:40, :50] = -9999  # nodata corner
+    path = str(tmp_path / "mag.tif")
+    with rasterio.open(path, "w", driver="GTiff", width=plan.W, height=plan.H, count=1, dtype="float32", crs="EPSG:4326",
+                       transform=from_bounds(*BBOX, plan.W, plan.H), nodata=-9999) as dst:
+        dst.write(data, 1)
+    kw = dict(local_rasters={"magnetic": path})
+    settings = dict(magnetic=True)
+    _assert_same_scan(run_scan_pipeline(ROI, settings, mem_budget_mb=256, **kw), run_scan_pipeline(ROI, settings, mem_budget_mb=8, **kw))
@@ -0,0 +1,31 @@
+import threading
+import numpy as np
+from core.prefetch import PrefetchCache, Prefetcher
+
+BBOX = (35.0, 39.0, 35.01, 39.01)
+
+def test_lookup_does_not_blend_nodata():
+    data = np.full((10, 10, 2), 5.0, dtype=np.float32)
+    data[:, :5] = 0.0  # left half never fetched (e.g. outside the S2 swath)
+    cache = PrefetchCache()
+    cache.put("s2", BBOX, (10, 10), data)
+    out = cache.lookup("s2", (35.0, 39.0, 35.01, 39.01), (7, 7))
+    valid = (out != 0).any(axis=2)
+    assert valid.any() and (~valid).any()
+    np.testing.assert_allclose(out[valid], 5.0, rtol=1e-6)  # no ramps towards 0 at the swath edge
+
+def test_lookup_same_grid_is_exact():
+    data = np.random.default_rng(0).random((8, 12, 3)).astype(np.float32) + 0.1
+    cache = PrefetchCache()
+    cache.put("s1", BBOX, (12, 8), data)
+    np.testing.assert_allclose(cache.lookup("s1", BBOX, (12, 8)), data, rtol=1e-6)
+
+def test_state_is_a_snapshot():
+    p = Prefetcher(PrefetchCache())
+    snap = p.state
+    threads = [threading.Thread(target=lambda: [p._bump("errors") for _ in range(1000)]) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert snap["errors"] == 0 and p.state["errors"] == 4000
@@ -0,0 +1,23 @@
+import numpy as np
+from core.pipeline import run_scan_pipeline
+from core.progressive import run_progressive_scan
+from core.roi import roi_from_bbox
+
+ROI = roi_from_bbox(35.0, 39.0, 35.03, 39.025)
+SETTINGS = dict(radar=True, optic=True)
+
+def test_demo_refinement_matches_a_normal_scan():
+    full = run_scan_pipeline(ROI, SETTINGS)
+    stages = list(run_progressive_scan(ROI, SETTINGS))
+    assert stages[0]["stage"] == "preview" and stages[-1]["stage"] == "final"
+    final = stages[-1]
+    assert final["heatmap"].shape == full["heatmap"].shape
+    assert np.corrcoef(final["heatmap"].ravel(), full["heatmap"].ravel())[0, 1] > 0.9
+    want = {(p["lat"], p["lon"]) for p in full["anomaly_points"]}
+    got = {(p["lat"], p["lon"]) for p in final["anomaly_points"]}
+    assert len(want & got) >= 0.8 * len(want)
+
+def test_extraction_mode_is_passed_through():
+    stages = list(run_progressive_scan(ROI, SETTINGS, extraction="components"))
+    assert all("area_px" in p for s in stages for p in s["anomaly_points"])
+    assert stages[-1]["anomaly_points"]
@@ -0,0 +1,77 @@
+import threading
+import time
+import numpy as np
+import pytest
+import core.pipeline
+from core.roi import roi_from_bbox
+from core.singleflight import SingleFlight, run_scan_shared, scan_key
+
+def _together(sf, key, fn, n=4):
+    """Run n sf.do(key, fn) calls while the first one's fn is still running; returns [(value, shared)] or exceptions."""
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return fn()
+
+    out = [None] * n
+
+    def call(i):
+        try:
+            out[i] = sf.do(key, slow)
+        except Exception as e:
+            out[i] = e
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=call, args=(i,)) for i in range(1, n)]
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.2)  # let the followers reach the in-flight future
+    release.set()
+    for t in threads:
+        t.join(5)
+    return out, len(calls)
+
+def test_concurrent_calls_share_one_run():
+    sf = SingleFlight()
+    out, runs = _together(sf, "k", lambda: {"v": 1})
+    assert runs == 1
+    assert [shared for _, shared in out] == [False, True, True, True]
+    assert all(v is out[0][0] for v, _ in out)
+    assert sf.inflight() == 0
+    assert sf.do("k", lambda: 2) == (2, False)  # released once done: the next call computes afresh
+
+def test_exception_reaches_every_waiter():
+    sf = SingleFlight()
+
+    def boom():
+        raise ValueError("fetch failed")
+
+    out, runs = _together(sf, "k", boom)
+    assert runs == 1
+    assert all(isinstance(e, ValueError) and str(e) == "fetch failed" for e in out)
+    assert sf.inflight() == 0
+
+def test_run_scan_shared_freezes_and_keys_on_params(monkeypatch):
+    seen = []
+
+    def fake(roi, settings, use_real_data=False, **params):
+        seen.append(params)
+        return {"heatmap": np.zeros((2, 2), dtype=np.float32), "anomaly_points": [], "layers": [np.ones(3)]}
+
+    monkeypatch.setattr(core.pipeline, "run_scan_pipeline", fake)
+    roi = roi_from_bbox(35.0, 39.0, 35.01, 39.01)
+    res = run_scan_shared(roi, {"radar": True}, target_m_per_px=10.0)
+    assert seen == [{"target_m_per_px": 10.0}]
+    with pytest.raises(ValueError):
+        res["heatmap"][0, 0] = 1.0
+    assert not res["layers"][0].flags.writeable
+    base = scan_key(roi, {"radar": True}, False, target_m_per_px=10.0)
+    assert base != scan_key(roi, {"radar": True}, False, target_m_per_px=5.0)
+    assert base != scan_key(roi, {"radar": True}, True, target_m_per_px=10.0)
+    assert base == scan_key(roi, {"radar": True}, 0, target_m_per_px=10.0)
@@ -0,0 +1,74 @@
+import threading
+import pytest
+import core.telemetry as tm
+from core.telemetry import PUBudget, PUBudgetExceeded, Metrics, estimate_pu
+
+def test_estimate_pu():
+    assert estimate_pu((512, 512), 3, float32=False) == 1.0
+    assert estimate_pu((512, 512), 6, float32=True) == 4.0
+    assert estimate_pu((8, 8), 1, float32=False) == 0.005
+
+def test_ledger_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "ledger.sqlite")
+    app, worker = PUBudget(10.0, path), PUBudget(10.0, path)  # two processes' views of one ledger
+    app.settle(app.reserve(3.0), 3.0)
+    worker.settle(worker.reserve(4.0), 4.0)
+    assert app.spent_today() == worker.spent_today() == 7.0
+    with pytest.raises(PUBudgetExceeded):
+        app.reserve(3.5)
+    assert PUBudget(10.0, path).remaining() == 3.0  # survives a restart
+
+def test_reservations_count_until_settled(tmp_path):
+    b = PUBudget(10.0, str(tmp_path / "ledger.sqlite"))
+    r = b.reserve(6.0)
+    assert b.remaining() == 4.0 and b.spent_today() == 0.0
+    with pytest.raises(PUBudgetExceeded):
+        b.reserve(5.0)
+    b.settle(r, 0.0)  # failed request: nothing spent
+    assert b.remaining() == 10.0
+
+def test_stale_reservations_expire(tmp_path, monkeypatch):
+    b = PUBudget(10.0, str(tmp_path / "ledger.sqlite"))
+    b.reserve(9.0)  # never settled: the process died
+    now = tm.time.time()
+    monkeypatch.setattr(tm.time, "time", lambda: now + tm.RESERVATION_TTL_S + 1)
+    assert b.remaining() == 10.0
+
+def test_concurrent_requests_cannot_overshoot(tmp_path):
+    path = str(tmp_path / "ledger.sqlite")
+    budgets = [PUBudget(10.0, path) for _ in range(4)]
+    granted = []
+
+    def _run(b):
+        for _ in range(10):
+            try:
+                r = b.reserve(1.0)
+            except PUBudgetExceeded:
+                continue
+            granted.append(1)
+            b.settle(r, 1.0)
+
+    threads = [threading.Thread(target=_run, args=(b,)) for b in budgets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(granted) == 10 and budgets[0].spent_today() == 10.0
+
+def test_no_limit_is_not_persisted(tmp_path):
+    path = tmp_path / "ledger.sqlite"
+    b = PUBudget(None, str(path))
+    b.settle(b.reserve(5.0), 5.0)
+    assert b.spent_today() == 5.0 and b.remaining() == float("inf")
+    assert not path.exists()
+
+def test_metrics_render():
+    m = Metrics()
+    m.counter("c_total", "a counter")
+    m.histogram("h_seconds", "a histogram", (0.5, 1.0))
+    m.inc("c_total", 2, layer="s1")
+    m.observe("h_seconds", 0.7, layer="s1")
+    text = m.render()
+    assert 'c_total{layer="s1"} 2' in text
+    assert 'h_seconds_bucket{layer="s1",le="0.5"} 0' in text and 'h_seconds_bucket{layer="s1",le="1"} 1' in text
+    assert 'h_seconds_count{layer="s1"} 1' in text